@@ -1,26 +1,657 @@
+import hashlib
 import os
+import queue
+import random
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+import httpx
 from dotenv import load_dotenv
 from google import genai
+from google.genai import errors as genai_errors
+from google.genai import types
+
+from poem_memo import get_poem_memo, memo_key
+from prompt_shaping import get_prompt_shaper
+from rate_limiter import RateLimitExceeded, get_gemini_limiter
 
 load_dotenv()
 
 # Gemini AI configuration
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+GEMINI_MODEL = "gemini-2.5-flash-lite-preview-06-17"
+
+# Bump whenever the poem prompt changes so memoized poems are not reused across prompts
+PROMPT_VERSION = "v1"
+
+
+def _is_rate_limited(error):
+    """Whether a Gemini error is a 429 / RESOURCE_EXHAUSTED quota error."""
+    return isinstance(error, genai_errors.APIError) and (
+        error.code == 429 or error.status == 'RESOURCE_EXHAUSTED'
+    )
+
+
+def _retry_after(error):
+    """Seconds Gemini asked us to wait, from Retry-After or the RetryInfo detail."""
+    headers = getattr(error.response, 'headers', None) or {}
+    try:
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        pass
+    details = error.details.get('error', error.details) if isinstance(error.details, dict) else {}
+    for detail in details.get('details', []) if isinstance(details, dict) else []:
+        if isinstance(detail, dict) and detail.get('@type', '').endswith('RetryInfo'):
+            match = re.match(r'([\d.]+)s$', str(detail.get('retryDelay', '')))
+            if match:
+                return float(match.group(1))
+    return None
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling Gemini while the circuit breaker is open."""
+
+    def __init__(self, retry_in):
+        self.retry_in = retry_in
+        super().__init__(f"Gemini circuit open; next probe in {retry_in:.1f}s")
+
 
-def convert_rant_to_poem_gemini(rant_text):
+class CircuitBreaker:
     """
-    Takes a rant string and uses the Gemini AI model to convert
-    it into a poem.
+    Circuit breaker for upstream calls
+    Features:
+    - Opens after failure_threshold consecutive failures
+    - While open, calls fail fast without touching the network
+    - After reset_timeout, lets a single half-open probe through
+    - A successful probe closes the circuit; a failed one reopens it
     """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self.stats = {'short_circuited': 0, 'opened': 0, 'probes': 0}
+
+    def retry_in(self):
+        """Seconds until the next half-open probe is allowed (0 when closed)."""
+        if self.state == self.CLOSED:
+            return 0.0
+        return max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+
+    def allow(self):
+        """Whether a call may go upstream now. In half-open state this claims the probe."""
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                self.stats['probes'] += 1
+                return True
+            self.stats['short_circuited'] += 1
+            return False
+
+    def release(self):
+        """An allowed call ended without telling us anything about upstream health."""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.stats['opened'] += 1
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def get_stats(self):
+        """Get the breaker state and counters."""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['state'] = self.state
+            stats['consecutive_failures'] = self._failures
+        stats['retry_in'] = round(self.retry_in(), 1)
+        return stats
+
+
+class GeminiClientPool:
+    """
+    Long-lived pool of Gemini clients sharing one keep-alive HTTP connection pool.
+    Replaces building a new client (and TLS connection) for every poem, and
+    counts new connections so connection reuse can be verified.
+    Every call is admitted by the shared adaptive rate limiter, which learns
+    from the calls' successes and 429s, and by a circuit breaker that fails
+    calls fast while Gemini is down.
+    """
+
+    def __init__(self, api_key, size=4, timeout=30.0, keepalive_expiry=120.0, limiter=None, max_wait=10.0,
+                 breaker=None):
+        self.size = size
+        self.timeout = timeout
+        self.limiter = limiter or get_gemini_limiter()
+        self.max_wait = max_wait
+        self.breaker = breaker or CircuitBreaker()
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            'calls': 0,
+            'connections_opened': 0,
+            'tls_handshakes': 0,
+            'pool_waits': 0
+        }
+
+        # One HTTP client so every pooled Gemini client reuses the same warm connections
+        self._http = httpx.Client(
+            limits=httpx.Limits(max_connections=size, max_keepalive_connections=size,
+                                keepalive_expiry=keepalive_expiry),
+            event_hooks={'request': [self._trace_request]}
+        )
+        self._clients = queue.Queue()
+        for _ in range(size):
+            self._clients.put(genai.Client(
+                api_key=api_key,
+                http_options=types.HttpOptions(timeout=int(timeout * 1000), httpx_client=self._http)
+            ))
+
+    def _trace_request(self, request):
+        """Attach an httpcore trace hook so new connections can be counted."""
+        request.extensions['trace'] = self._trace
+
+    def _trace(self, event_name, info):
+        if event_name == 'connection.connect_tcp.complete':
+            with self._stats_lock:
+                self.stats['connections_opened'] += 1
+        elif event_name == 'connection.start_tls.complete':
+            with self._stats_lock:
+                self.stats['tls_handshakes'] += 1
+
+    @contextmanager
+    def client(self):
+        """Check a client out of the pool for the duration of one call."""
+        try:
+            client = self._clients.get_nowait()
+        except queue.Empty:
+            with self._stats_lock:
+                self.stats['pool_waits'] += 1
+            client = self._clients.get()
+        try:
+            yield client
+        finally:
+            self._clients.put(client)
+
+    def _admit(self, max_wait):
+        """Pass the circuit breaker, then wait for a rate limiter slot."""
+        if not self.breaker.allow():
+            raise CircuitOpenError(self.breaker.retry_in())
+        try:
+            self.limiter.acquire(max_wait=self.max_wait if max_wait is None else max_wait)
+        except RateLimitExceeded:
+            self.breaker.release()
+            raise
+
+    def _record_success(self):
+        self.limiter.record_success()
+        self.breaker.record_success()
+
+    def _record_failure(self, error):
+        """Feed quota errors to the rate limiter and outages to the circuit breaker."""
+        if _is_rate_limited(error):
+            self.limiter.throttled(_retry_after(error))
+            self.breaker.release()
+        elif isinstance(error, genai_errors.ClientError):
+            # Our request was rejected; upstream itself is healthy
+            self.breaker.release()
+        else:
+            # Timeouts, connection errors and 5xx responses
+            self.breaker.record_failure()
+
+    def _config(self, timeout):
+        """Per-call request config carrying the call's deadline."""
+        timeout = self.timeout if timeout is None else timeout
+        return types.GenerateContentConfig(http_options=types.HttpOptions(timeout=int(timeout * 1000)))
+
+    def generate(self, prompt, timeout=None, model=GEMINI_MODEL, max_wait=None, admitted=None):
+        """
+        Run one generate_content call on a pooled client with a per-call deadline.
+        Gemini sends nothing until the poem is complete, so the read timeout
+        bounds the whole call.
+        timeout: call deadline in seconds (defaults to the pool timeout)
+        max_wait: seconds to wait for the rate limiter before raising RateLimitExceeded
+        admitted: called once the call holds a limiter slot and a pooled client,
+                  right before the upstream request
+        Raises CircuitOpenError at once while the circuit breaker is open.
+        """
+        config = self._config(timeout)
+        self._admit(max_wait)
+        with self.client() as client:
+            with self._stats_lock:
+                self.stats['calls'] += 1
+            if admitted:
+                admitted()
+            try:
+                response = client.models.generate_content(model=model, contents=prompt, config=config)
+            except Exception as e:
+                self._record_failure(e)
+                raise
+        self._record_success()
+        return response
+
+    def generate_stream(self, prompt, timeout=None, model=GEMINI_MODEL, max_wait=None):
+        """
+        Stream one generation on a pooled client, yielding text chunks as they arrive.
+        The client stays checked out until the stream is exhausted or closed.
+        The deadline bounds the whole stream, not just the gap between chunks.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        config = self._config(timeout)
+        self._admit(max_wait)
+        deadline = time.monotonic() + timeout
+        received = False
+        with self.client() as client:
+            with self._stats_lock:
+                self.stats['calls'] += 1
+            try:
+                for chunk in client.models.generate_content_stream(model=model, contents=prompt, config=config):
+                    received = True
+                    if chunk.text:
+                        yield chunk.text
+                    if time.monotonic() > deadline:
+                        raise TimeoutError(f"Gemini stream exceeded its {timeout:.0f}s deadline")
+            except GeneratorExit:
+                # The consumer stopped early; Gemini was healthy if it had started answering
+                if received:
+                    self._record_success()
+                else:
+                    self.breaker.release()
+                raise
+            except Exception as e:
+                self._record_failure(e)
+                raise
+        self._record_success()
+
+    def get_stats(self):
+        """Get call and connection counters, including the connection reuse ratio."""
+        with self._stats_lock:
+            stats = dict(self.stats)
+        reused = max(stats['calls'] - stats['connections_opened'], 0)
+        stats['connections_reused'] = reused
+        stats['reuse_ratio'] = round(reused / stats['calls'], 3) if stats['calls'] else None
+        stats['pool_size'] = self.size
+        return stats
+
+
+# Global Gemini client pool shared by the API handlers and the cache worker
+_gemini_pool = None
+_gemini_pool_lock = threading.Lock()
+
+def get_gemini_pool():
+    """Get the process-wide Gemini client pool (None without an API key)"""
+    global _gemini_pool
     if not GEMINI_API_KEY:
-        return "Error: Gemini API key not found. Please set the GEMINI_API_KEY environment variable."
+        return None
+    with _gemini_pool_lock:
+        if _gemini_pool is None:
+            _gemini_pool = GeminiClientPool(
+                GEMINI_API_KEY,
+                size=int(os.getenv("GEMINI_POOL_SIZE", 4)),
+                timeout=float(os.getenv("GEMINI_TIMEOUT_SECONDS", 30)),
+                max_wait=float(os.getenv("GEMINI_MAX_WAIT_SECONDS", 10)),
+                breaker=CircuitBreaker(
+                    failure_threshold=int(os.getenv("GEMINI_BREAKER_FAILURES", 5)),
+                    reset_timeout=float(os.getenv("GEMINI_BREAKER_RESET_SECONDS", 30))
+                )
+            )
+        return _gemini_pool
 
-    try:
-        # Initialize the Gemini client
-        client = genai.Client(api_key=GEMINI_API_KEY)
-        
-        # Create the prompt for poem generation
-        prompt = f"""Transform this rant into a beautiful 4-stanza free verse poem. Output ONLY the poem text with no introduction, explanation, or commentary.
+
+class GeminiProvider:
+    """Poem provider backed by one Gemini model on the shared client pool."""
+
+    def __init__(self, pool, model=GEMINI_MODEL):
+        self.pool = pool
+        self.model = model
+        self.name = model
+
+    def generate_text(self, prompt, timeout=None, max_wait=None, admitted=None):
+        """Generate the full response text for a prompt."""
+        return self.pool.generate(prompt, timeout=timeout, model=self.model, max_wait=max_wait,
+                                  admitted=admitted).text
+
+    def stream_text(self, prompt, timeout=None, max_wait=None):
+        """Yield response text chunks as they arrive."""
+        return self.pool.generate_stream(prompt, timeout=timeout, model=self.model, max_wait=max_wait)
+
+    def get_stats(self):
+        return {'name': self.name, 'client_pool': self.pool.get_stats(),
+                'circuit': self.pool.breaker.get_stats()}
+
+
+class StubPoemProvider:
+    """
+    Deterministic local provider for tests and offline development.
+    Answers the single and batch prompts built in this module with poems
+    assembled from the rant's own words, seeded by the rant text, so the
+    same prompt always yields the same output.
+    """
+
+    name = 'stub'
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.stats = {'calls': 0}
+
+    @staticmethod
+    def _poem(rant_text, variant):
+        words = re.findall(r"[A-Za-z']+", rant_text) or ['silence']
+        seed = hashlib.sha256(f"{variant}\x00{rant_text}".encode('utf-8')).digest()
+        rng = random.Random(seed)
+        stanzas = []
+        for _ in range(4):
+            stanzas.append('\n'.join(
+                ' '.join(rng.choice(words) for _ in range(rng.randint(3, 6))).capitalize()
+                for _ in range(2)
+            ))
+        return '\n\n'.join(stanzas)
+
+    def generate_text(self, prompt, timeout=None, max_wait=None, admitted=None):
+        """Generate the full response text for a prompt."""
+        self.stats['calls'] += 1
+        if admitted:
+            admitted()
+        if self.delay:
+            time.sleep(self.delay)
+        rants = re.findall(r'^RANT(?: \d+)?:\n(.*?)(?=\n\n|\Z)', prompt, flags=re.MULTILINE | re.DOTALL)
+        if not re.search(r'=== POEM n', prompt):
+            return self._poem(rants[0] if rants else prompt, 1)
+
+        variants_match = re.search(r'v from 1 to (\d+)', prompt)
+        variants = int(variants_match.group(1)) if variants_match else 1
+        sections = []
+        for n, rant_text in enumerate(rants, start=1):
+            for v in range(1, variants + 1):
+                marker = f"=== POEM {n} VARIANT {v} ===" if variants_match else f"=== POEM {n} ==="
+                sections.append(f"{marker}\n{self._poem(rant_text, v)}")
+        return '\n\n'.join(sections)
+
+    def stream_text(self, prompt, timeout=None, max_wait=None):
+        """Yield the response one line at a time."""
+        for line in self.generate_text(prompt, timeout, max_wait).split('\n'):
+            yield line + '\n'
+
+    def get_stats(self):
+        return {'name': self.name, **self.stats}
+
+
+class HedgedPoemProvider:
+    """
+    Hedged requests across two providers
+    Features:
+    - Sends to the primary; if it has not answered within its observed p95
+      latency, sends the same prompt to the secondary and takes whichever
+      finishes first
+    - Hedges are capped by a budget: each call earns `budget` hedge credit,
+      each hedge spends one, so hedges stay near budget * calls
+    - Primary latency is tracked over a sliding window, including calls the
+      secondary won
+    - The hedge timer and latency samples start once the primary is admitted,
+      so time queued for a rate limiter slot or pooled client never triggers
+      a hedge
+    - Streams are not hedged and go to the primary only
+    """
+
+    def __init__(self, primary, secondary, budget=0.1, initial_delay=3.0, min_delay=0.5,
+                 window=200, min_samples=20, max_credit=5.0):
+        self.primary = primary
+        self.secondary = secondary
+        self.name = primary.name
+        self.budget = budget
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.max_credit = max_credit
+        self._latencies = deque(maxlen=window)
+        self._credit = 1.0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='poem-hedge')
+        self.stats = {'calls': 0, 'hedges_sent': 0, 'hedge_wins': 0, 'budget_denied': 0}
+
+    def hedge_delay(self):
+        """Seconds to wait on the primary before hedging: its p95 latency."""
+        with self._lock:
+            samples = sorted(self._latencies)
+        if len(samples) < self.min_samples:
+            return self.initial_delay
+        return max(self.min_delay, samples[int(0.95 * (len(samples) - 1))])
+
+    def _record_latency(self, started, future):
+        if started and not future.cancelled() and future.exception() is None:
+            with self._lock:
+                self._latencies.append(time.monotonic() - started[0])
+
+    def _take_hedge_credit(self):
+        with self._lock:
+            if self._credit >= 1:
+                self._credit -= 1
+                self.stats['hedges_sent'] += 1
+                return True
+            self.stats['budget_denied'] += 1
+            return False
+
+    def generate_text(self, prompt, timeout=None, max_wait=None, admitted=None):
+        """Generate the response text, hedging to the secondary on a slow primary."""
+        with self._lock:
+            self.stats['calls'] += 1
+            self._credit = min(self.max_credit, self._credit + self.budget)
+
+        started = []
+        ready = threading.Event()
+
+        def on_admitted():
+            started.append(time.monotonic())
+            ready.set()
+            if admitted:
+                admitted()
+
+        primary = self._executor.submit(self.primary.generate_text, prompt, timeout, max_wait, on_admitted)
+        primary.add_done_callback(lambda future: self._record_latency(started, future))
+        primary.add_done_callback(lambda future: ready.set())
+        pending = {primary}
+
+        # A primary still queued for a slot would only queue the hedge behind it
+        ready.wait()
+        remaining = started[0] + self.hedge_delay() - time.monotonic() if started else 0
+        done, _ = wait(pending, timeout=max(0.0, remaining))
+
+        if not done and self._take_hedge_credit():
+            pending.add(self._executor.submit(self.secondary.generate_text, prompt, timeout, max_wait))
+
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is not primary:
+                        with self._lock:
+                            self.stats['hedge_wins'] += 1
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def stream_text(self, prompt, timeout=None, max_wait=None):
+        return self.primary.stream_text(prompt, timeout, max_wait)
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['hedge_credit'] = round(self._credit, 2)
+            stats['latency_samples'] = len(self._latencies)
+        stats['hedge_delay_ms'] = round(self.hedge_delay() * 1000)
+        stats['primary'] = self.primary.get_stats()
+        stats['secondary'] = self.secondary.get_stats()
+        return stats
+
+
+# Global poem provider used by every poem generation call
+_poem_provider = None
+
+def get_poem_provider():
+    """
+    Get the process-wide poem provider (None when no provider is configured).
+    POEM_PROVIDER=stub selects the deterministic local stub; otherwise Gemini,
+    hedged to GEMINI_HEDGE_MODEL when one is set.
+    """
+    global _poem_provider
+    if os.getenv("POEM_PROVIDER", "gemini").lower() == "stub":
+        with _gemini_pool_lock:
+            if _poem_provider is None:
+                _poem_provider = StubPoemProvider()
+            return _poem_provider
+
+    pool = get_gemini_pool()
+    if pool is None:
+        return None
+    with _gemini_pool_lock:
+        if _poem_provider is None:
+            _poem_provider = GeminiProvider(pool)
+            hedge_model = os.getenv("GEMINI_HEDGE_MODEL")
+            if hedge_model:
+                _poem_provider = HedgedPoemProvider(
+                    _poem_provider,
+                    GeminiProvider(pool, model=hedge_model),
+                    budget=float(os.getenv("GEMINI_HEDGE_BUDGET", 0.1))
+                )
+        return _poem_provider
+
+
+def ai_configured():
+    """Whether AI poem generation is available."""
+    return get_poem_provider() is not None
+
+# Common phrases that AI might add despite instructions
+UNWANTED_PREFIXES = [
+    "here's the poem:", "here is the poem:", "poem:", "here's a poem:",
+    "here is a poem:", "the poem:", "this is the poem:", "here's your poem:",
+    "here is your poem:", "your poem:", "the transformed poem:"
+]
+
+UNWANTED_SUFFIXES = [
+    "this poem captures", "the poem reflects", "i hope this captures",
+    "this transformation", "the verse above"
+]
+
+
+def clean_poem_text(poem):
+    """
+    Remove any potential prefixes or suffixes that might still appear
+    around the poem, and drop empty lines.
+    """
+    poem = poem.strip()
+    
+    # Clean up the poem text
+    poem_lower = poem.lower()
+    for prefix in UNWANTED_PREFIXES:
+        if poem_lower.startswith(prefix):
+            poem = poem[len(prefix):].strip()
+            break
+    
+    # Remove any trailing explanatory text
+    lines = poem.split('\n')
+    cleaned_lines = []
+    for line in lines:
+        line_lower = line.lower().strip()
+        # Stop if we hit explanatory text
+        if any(suffix in line_lower for suffix in UNWANTED_SUFFIXES):
+            break
+        if line.strip():  # Only add non-empty lines
+            cleaned_lines.append(line)
+    
+    return '\n'.join(cleaned_lines).strip()
+
+
+class IncrementalPoemCleaner:
+    """
+    Applies the clean_poem_text rules to a poem arriving in chunks, releasing
+    each line as soon as it is complete: the unwanted prefix is stripped from
+    the first line, empty lines are dropped and the first line of trailing
+    explanation ends the poem.
+    """
+
+    def __init__(self):
+        self._buffer = ''
+        self._started = False
+        self._prefix_checked = False
+        self.lines = []
+        self.done = False
+
+    def _clean_line(self, line):
+        if self.done:
+            return None
+        if not self._started:
+            line = line.strip()
+            if not line:
+                return None
+            self._started = True
+            if not self._prefix_checked:
+                self._prefix_checked = True
+                line_lower = line.lower()
+                for prefix in UNWANTED_PREFIXES:
+                    if line_lower.startswith(prefix):
+                        line = line[len(prefix):].strip()
+                        break
+                if not line:
+                    # The prefix was a line of its own; the poem starts on the next one
+                    self._started = False
+                    return None
+        if any(suffix in line.lower().strip() for suffix in UNWANTED_SUFFIXES):
+            self.done = True
+            return None
+        if not line.strip():
+            return None
+        line = line.rstrip()
+        self.lines.append(line)
+        return line
+
+    def feed(self, chunk):
+        """Add a chunk of model output. Returns the cleaned lines it completed."""
+        self._buffer += chunk
+        *complete, self._buffer = self._buffer.split('\n')
+        return [line for line in map(self._clean_line, complete) if line]
+
+    def finish(self):
+        """Flush the last, unterminated line. Returns it as a list (possibly empty)."""
+        line = self._clean_line(self._buffer)
+        self._buffer = ''
+        return [line] if line else []
+
+    @property
+    def poem(self):
+        """The cleaned poem so far."""
+        return '\n'.join(self.lines)
+
+
+def _single_poem_prompt(rant_text):
+    """Prompt asking Gemini for one poem from one rant (compressed to the token budget)."""
+    rant_text = get_prompt_shaper().shape(rant_text)
+    return f"""Transform this rant into a beautiful 4-stanza free verse poem. Output ONLY the poem text with no introduction, explanation, or commentary.
 
 RANT:
 {rant_text}
@@ -35,48 +666,42 @@ Requirements:
 
 OUTPUT ONLY THE POEM - NO OTHER TEXT."""
 
-        # Generate content using Gemini
-        response = client.models.generate_content(
-            model="gemini-2.5-flash-lite-preview-06-17",
-            contents=prompt
-        )
+
+def _generate_text(provider, prompt, timeout=None, max_wait=None, rants=1):
+    """Run one provider call, recording its prompt size and latency."""
+    started = time.monotonic()
+    text = provider.generate_text(prompt, timeout=timeout, max_wait=max_wait)
+    get_prompt_shaper().record_call(prompt, time.monotonic() - started, rants)
+    return text
+
+
+def convert_rant_to_poem_gemini(rant_text, timeout=None, max_wait=None):
+    """
+    Takes a rant string and uses the Gemini AI model to convert
+    it into a poem.
+    timeout: optional per-call deadline in seconds (defaults to the pool timeout)
+    max_wait: optional rate limiter wait budget in seconds (defaults to the pool's)
+    """
+    provider = get_poem_provider()
+    if provider is None:
+        return "Error: Gemini API key not found. Please set the GEMINI_API_KEY environment variable."
+
+    # Serve repeats of the same rant text from the memo instead of calling Gemini again
+    memo = get_poem_memo()
+    key = _variant_memo_key(rant_text, 0)
+    memoized_poem = memo.get(key)
+    if memoized_poem is not None:
+        return memoized_poem
+
+    try:
+        # Generate content through the configured provider (pooled Gemini clients by default)
+        text = _generate_text(provider, _single_poem_prompt(rant_text), timeout, max_wait)
         
         # Extract and clean the poem text
-        poem = response.text.strip()
-        
-        # Remove any potential prefixes or suffixes that might still appear
-        # Common phrases that AI might add despite instructions
-        unwanted_prefixes = [
-            "here's the poem:", "here is the poem:", "poem:", "here's a poem:",
-            "here is a poem:", "the poem:", "this is the poem:", "here's your poem:",
-            "here is your poem:", "your poem:", "the transformed poem:"
-        ]
-        
-        unwanted_suffixes = [
-            "this poem captures", "the poem reflects", "i hope this captures",
-            "this transformation", "the verse above"
-        ]
-        
-        # Clean up the poem text
-        poem_lower = poem.lower()
-        for prefix in unwanted_prefixes:
-            if poem_lower.startswith(prefix):
-                poem = poem[len(prefix):].strip()
-                break
-        
-        # Remove any trailing explanatory text
-        lines = poem.split('\n')
-        cleaned_lines = []
-        for line in lines:
-            line_lower = line.lower().strip()
-            # Stop if we hit explanatory text
-            if any(suffix in line_lower for suffix in unwanted_suffixes):
-                break
-            if line.strip():  # Only add non-empty lines
-                cleaned_lines.append(line)
-        
-        poem = '\n'.join(cleaned_lines).strip()
+        poem = clean_poem_text(text)
         
+        if poem:
+            memo.put(key, poem)
         return poem
 
     except Exception as e:
@@ -84,12 +709,158 @@ OUTPUT ONLY THE POEM - NO OTHER TEXT."""
         return "The muses are silent... an error occurred while connecting to Gemini AI."
 
 
+def stream_rant_to_poem_gemini(rant_text, timeout=None):
+    """
+    Stream a poem for a rant line by line as Gemini produces it, with the
+    clean_poem_text rules applied incrementally. Memoized poems are replayed
+    at once and completed poems are memoized.
+    Raises on configuration or upstream errors so the caller can report them
+    in-stream (lines may already have been yielded).
+    """
+    provider = get_poem_provider()
+    if provider is None:
+        raise RuntimeError("Gemini API key not found. Please set the GEMINI_API_KEY environment variable.")
+
+    memo = get_poem_memo()
+    key = _variant_memo_key(rant_text, 0)
+    memoized_poem = memo.get(key)
+    if memoized_poem is not None:
+        yield from memoized_poem.split('\n')
+        return
+
+    cleaner = IncrementalPoemCleaner()
+    chunks = provider.stream_text(_single_poem_prompt(rant_text), timeout=timeout)
+    try:
+        for chunk in chunks:
+            yield from cleaner.feed(chunk)
+            if cleaner.done:
+                break
+        yield from cleaner.finish()
+    finally:
+        # Hand the pooled client back even if the consumer disconnected early
+        chunks.close()
+
+    if cleaner.lines:
+        memo.put(key, cleaner.poem)
+
+
+def _parse_batch_poems(text, count, variants=1, min_lines=4):
+    """
+    Split a batched response on its "=== POEM n ===" / "=== POEM n VARIANT v ===" markers.
+    Returns, per rant, the list of cleaned poems that parsed; poems that are
+    missing or too short to be a real poem are left out.
+    """
+    poems = [dict() for _ in range(count)]
+    parts = re.split(r'^\s*=+\s*POEM\s+(\d+)(?:\s+VARIANT\s+(\d+))?\s*=+\s*$', text,
+                     flags=re.MULTILINE | re.IGNORECASE)
+    
+    # parts = [preamble, number, variant, body, number, variant, body, ...]
+    for number, variant, body in zip(parts[1::3], parts[2::3], parts[3::3]):
+        index = int(number) - 1
+        variant_index = int(variant or 1) - 1
+        if 0 <= index < count and 0 <= variant_index < variants and variant_index not in poems[index]:
+            poem = clean_poem_text(body)
+            if len(poem.split('\n')) >= min_lines:
+                poems[index][variant_index] = poem
+    return [[found[v] for v in sorted(found)] for found in poems]
+
+
+def _variant_memo_key(rant_text, variant_index):
+    """Memo key of one poem variant; the first variant shares the single-poem key."""
+    version = f"{PROMPT_VERSION}:{get_poem_provider().name}"
+    if variant_index:
+        version += f":variant{variant_index + 1}"
+    return memo_key(rant_text, version)
+
+
+def convert_rants_to_poem_variants_gemini(rant_texts, variants=1, timeout=None, max_wait=None):
+    """
+    Convert several rants into `variants` distinct poems each, with a single
+    Gemini request. Returns a list aligned with rant_texts holding each rant's
+    poems (possibly fewer than asked, or none, where generation or validation
+    failed). Rants whose variants are all memoized are not sent again.
+    """
+    results = [[] for _ in rant_texts]
+    provider = get_poem_provider()
+    if provider is None or not rant_texts:
+        return results
+
+    memo = get_poem_memo()
+    pending = []
+    for i, text in enumerate(rant_texts):
+        memoized = [memo.get(_variant_memo_key(text, v)) for v in range(variants)]
+        if all(poem is not None for poem in memoized):
+            results[i] = memoized
+        else:
+            pending.append(i)
+    if not pending:
+        return results
+
+    try:
+        shaper = get_prompt_shaper()
+        rant_sections = "\n\n".join(
+            f"RANT {n}:\n{shaper.shape(rant_texts[i])}" for n, i in enumerate(pending, start=1)
+        )
+        if variants > 1:
+            task = f"write {variants} different beautiful 4-stanza free verse poems"
+            marker = f'a line "=== POEM n VARIANT v ===" (v from 1 to {variants}) followed by that poem'
+        else:
+            task = "write its own beautiful 4-stanza free verse poem"
+            marker = 'a line "=== POEM n ===" followed by that poem'
+        prompt = f"""For each of the following {len(pending)} rants, {task}.
+
+{rant_sections}
+
+Requirements for every poem:
+- Exactly 4 stanzas
+- Free verse style (no forced rhyme scheme)
+- Capture the emotional essence and frustration of its rant
+- Transform anger into poetic expression
+- Use vivid imagery and metaphors
+- Each stanza should be 2-4 lines
+
+Output format: for each rant n, output {marker}.
+OUTPUT ONLY THE MARKERS AND POEMS - NO OTHER TEXT."""
+
+        text = _generate_text(provider, prompt, timeout, max_wait, rants=len(pending))
+        batch_poems = _parse_batch_poems(text, len(pending), variants=variants)
+        
+        for i, poems in zip(pending, batch_poems):
+            results[i] = poems
+            for v, poem in enumerate(poems):
+                memo.put(_variant_memo_key(rant_texts[i], v), poem)
+        return results
+
+    except Exception as e:
+        print(f"Gemini AI batch error occurred: {e}")
+        return results
+
+
+def convert_rants_to_poems_gemini(rant_texts, timeout=None, max_wait=None):
+    """
+    Convert several rants into poems with a single Gemini request.
+    Returns a list aligned with rant_texts holding each poem, or None for
+    rants whose poem could not be generated or failed validation (callers
+    fall back per item). Memoized rants are not sent again.
+    """
+    return [poems[0] if poems else None
+            for poems in convert_rants_to_poem_variants_gemini(rant_texts, 1, timeout, max_wait)]
+
+
+def convert_rant_to_poem_variants_gemini(rant_text, variants=3, timeout=None, max_wait=None):
+    """
+    Ask Gemini for several candidate poems for one rant in a single call.
+    Returns the poems that parsed (empty on failure).
+    """
+    return convert_rants_to_poem_variants_gemini([rant_text], variants, timeout, max_wait)[0]
+
+
 # Keep the old function name for backward compatibility
-def convert_rant_to_poem_mistral_new(rant_text):
+def convert_rant_to_poem_mistral_new(rant_text, timeout=None, max_wait=None):
     """
     Backward compatibility function - now uses Gemini instead of Mistral
     """
-    return convert_rant_to_poem_gemini(rant_text)
+    return convert_rant_to_poem_gemini(rant_text, timeout=timeout, max_wait=max_wait)
 
 
 # --- Test the implementation ---
@@ -1,9 +1,15 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request, stream_with_context
 from flask_cors import CORS
-from reddit_scraper import RedditRantScraper, FallbackRantScraper
-from aiPoem import convert_rant_to_poem_mistral_new
+from reddit_scraper import get_scraper
+from rate_limiter import get_reddit_scheduler, get_gemini_limiter
+from aiPoem import convert_rant_to_poem_mistral_new, get_gemini_pool, get_poem_provider, stream_rant_to_poem_gemini
+from poem_memo import get_poem_memo
+from prompt_shaping import get_prompt_shaper
 from cache_manager import get_cache_manager, initialize_cache
+import json
 import os
+import signal
+import sys
 import time
 from dotenv import load_dotenv
 
@@ -12,27 +18,27 @@ load_dotenv()
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
-# Initialize cache system for high performance
+# Deadline for Gemini calls made while a client waits (cache fills use the pool default)
+GEMINI_REQUEST_TIMEOUT = float(os.getenv('GEMINI_REQUEST_TIMEOUT_SECONDS', 15))
+
+# Initialize cache system for high performance (warm-up continues in the background)
 print("🚀 Initializing high-performance cache system...")
 cache_manager = initialize_cache(target_size=20, min_size=5)
-print("✅ Cache system ready!")
+print("✅ Cache system started, warming up in background")
 
-# Initialize scrapers (fallback for non-cached requests)
-try:
-    # Try to initialize the main scraper
-    if os.getenv('REDDIT_CLIENT_ID') and os.getenv('REDDIT_CLIENT_SECRET'):
-        scraper = RedditRantScraper()
-        use_main_scraper = True
-        print("Using Reddit API scraper for fallback")
+def _handle_sigterm(signum, frame):
+    """Stop the cache workers and save the final snapshot; atexit does not run on SIGTERM"""
+    cache_manager.stop_background_worker()
+    if callable(_previous_sigterm_handler):
+        _previous_sigterm_handler(signum, frame)
     else:
-        scraper = FallbackRantScraper()
-        use_main_scraper = False
-        print("Using fallback scraper for non-cached requests")
-except Exception as e:
-    print(f"Error initializing main scraper: {e}")
-    scraper = FallbackRantScraper()
-    use_main_scraper = False
-    print("Using fallback scraper")
+        sys.exit(0)
+
+_previous_sigterm_handler = signal.signal(signal.SIGTERM, _handle_sigterm)
+
+# Shared scraper for non-cached requests (same instance the cache uses)
+scraper = get_scraper()
+use_main_scraper = scraper.using_live_data
 
 @app.route('/api/rant', methods=['GET'])
 def get_random_rant():
@@ -101,7 +107,7 @@ def generate_poem():
             }), 400
         
         # Generate the poem using the AI
-        poem = convert_rant_to_poem_mistral_new(rant_text)
+        poem = convert_rant_to_poem_mistral_new(rant_text, timeout=GEMINI_REQUEST_TIMEOUT)
         
         # Check if there was an error in poem generation
         if poem.startswith("Error:") or poem.startswith("The muses are silent") or poem.startswith("The poet's ink ran dry"):
@@ -122,6 +128,70 @@ def generate_poem():
             'error': f'Internal server error: {str(e)}'
         }), 500
 
+def _sse_event(event, payload):
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+@app.route('/api/poem/stream', methods=['POST'])
+def stream_poem():
+    """
+    Stream a poem for a rant text as Server-Sent Events.
+    Emits a 'line' event per cleaned poem line as Gemini produces it, then
+    'done' with the full poem, or 'error' if generation fails.
+    """
+    data = request.get_json(silent=True)
+    
+    if not isinstance(data, dict) or 'rant_text' not in data:
+        return jsonify({
+            'success': False,
+            'error': 'rant_text is required in request body'
+        }), 400
+    
+    rant_text = data['rant_text']
+    
+    if not isinstance(rant_text, str):
+        return jsonify({
+            'success': False,
+            'error': 'rant_text must be a string'
+        }), 400
+    
+    if not rant_text.strip():
+        return jsonify({
+            'success': False,
+            'error': 'rant_text cannot be empty'
+        }), 400
+    
+    def generate():
+        start_time = time.time()
+        lines = []
+        # Flush headers straight away so the client sees the stream open
+        yield ": stream open\n\n"
+        try:
+            for line in stream_rant_to_poem_gemini(rant_text, timeout=GEMINI_REQUEST_TIMEOUT):
+                if not lines:
+                    first_line_ms = round((time.time() - start_time) * 1000, 2)
+                lines.append(line)
+                yield _sse_event('line', {'line': line, 'index': len(lines) - 1})
+            
+            if not lines:
+                yield _sse_event('error', {'error': 'The muses are silent... Gemini returned an empty poem.'})
+                return
+            
+            yield _sse_event('done', {
+                'success': True,
+                'original_rant': rant_text,
+                'poem': '\n'.join(lines),
+                'first_line_ms': first_line_ms,
+                'response_time_ms': round((time.time() - start_time) * 1000, 2)
+            })
+        except Exception as e:
+            yield _sse_event('error', {'error': f'The muses are silent... {str(e)}'})
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # Keep reverse proxies from buffering the stream
+    })
+
 @app.route('/api/rant-and-poem', methods=['GET'])
 def get_rant_and_poem():
     """Get a random rant and generate a poem from it - CACHED VERSION for instant performance!"""
@@ -164,7 +234,7 @@ def get_rant_and_poem():
             full_rant_text = f"{rant['title']}. {rant['content']}"
             
             # Generate the poem
-            poem = convert_rant_to_poem_mistral_new(full_rant_text)
+            poem = convert_rant_to_poem_mistral_new(full_rant_text, timeout=GEMINI_REQUEST_TIMEOUT)
             is_ai = True
             
             # Check if there was an error in poem generation
@@ -271,6 +341,43 @@ def get_cache_stats():
             'error': str(e)
         }), 500
 
+@app.route('/api/scraper/stats', methods=['GET'])
+def get_scraper_stats():
+    """Get per-subreddit fetch yield, latency and sampling share"""
+    try:
+        return jsonify({
+            'success': True,
+            'scraper_type': type(scraper).__name__,
+            'subreddits': scraper.get_subreddit_stats() if hasattr(scraper, 'get_subreddit_stats') else {},
+            'listings': scraper.get_listing_stats() if hasattr(scraper, 'get_listing_stats') else {},
+            'rate_limit': get_reddit_scheduler().get_stats()
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/ai/stats', methods=['GET'])
+def get_ai_stats():
+    """Get Gemini client pool, connection reuse, rate limiter, poem memo and prompt size statistics"""
+    try:
+        pool = get_gemini_pool()
+        return jsonify({
+            'success': True,
+            'gemini_configured': pool is not None,
+            'client_pool': pool.get_stats() if pool else None,
+            'provider': get_poem_provider().get_stats() if get_poem_provider() else None,
+            'rate_limit': get_gemini_limiter().get_stats(),
+            'poem_memo': get_poem_memo().get_stats(),
+            'prompt_shaping': get_prompt_shaper().get_stats()
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @app.route('/api/cache/warm', methods=['POST'])
 def warm_cache():
     """Manually warm the cache"""
@@ -318,16 +425,39 @@ def health_check():
     # Get cache stats
     cache_stats = cache_manager.get_cache_stats()
     
+    # Gemini circuit breaker: while open, poems come from the fallback templates
+    pool = get_gemini_pool()
+    ai_circuit = pool.breaker.get_stats() if pool else None
+    
     return jsonify({
-        'status': 'healthy',
+        'status': 'degraded' if ai_circuit and ai_circuit['state'] != 'closed' else 'healthy',
         'scraper_type': 'live' if use_main_scraper else 'fallback',
         'ai_poem_configured': hf_token_configured,
+        'ai_circuit': ai_circuit,
         'cache_enabled': True,
         'cache_size': cache_stats['cache_size'],
         'cache_hit_ratio': f"{cache_stats['cache_hits']}/{cache_stats['cache_hits'] + cache_stats['cache_misses']}" if (cache_stats['cache_hits'] + cache_stats['cache_misses']) > 0 else "0/0",
         'message': 'Reddit Rant Scraper API is running with high-performance caching'
     })
 
+@app.route('/api/health/live', methods=['GET'])
+def liveness_check():
+    """Liveness probe: the process is up and the cache worker is running."""
+    readiness = cache_manager.get_readiness()
+    return jsonify({
+        'status': 'alive' if readiness['live'] else 'worker_stopped',
+        'cache_size': readiness['cache_size']
+    }), 200 if readiness['live'] else 503
+
+@app.route('/api/health/ready', methods=['GET'])
+def readiness_check():
+    """Readiness probe: 503 until the cache has warmed up, so load balancers hold traffic."""
+    readiness = cache_manager.get_readiness()
+    return jsonify({
+        'status': 'ready' if readiness['ready'] else 'warming_up',
+        **readiness
+    }), 200 if readiness['ready'] else 503
+
 @app.route('/api/setup-info', methods=['GET'])
 def setup_info():
     """Provide setup information for the API."""
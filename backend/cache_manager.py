@@ -3,18 +3,24 @@ Cache Manager for Reddit Rant Roulette
 Pre-generates and caches rant-poem pairs for instant serving
 Optimized for Gemini AI rate limits
 """
+import atexit
+import gzip
+import hashlib
 import threading
 import time
 import json
 import os
+import queue
+import uuid
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 from collections import deque
 import random
 import logging
 
-from reddit_scraper import RedditRantScraper, FallbackRantScraper
-from aiPoem import convert_rant_to_poem_gemini
+from reddit_scraper import get_scraper
+from aiPoem import ai_configured, convert_rants_to_poem_variants_gemini
+from dedup import get_seen_index, get_near_duplicate_index
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -27,23 +33,74 @@ class RantPoemCache:
     Features:
     - Pre-generates content in background
     - Maintains hot cache of ready-to-serve pairs
-    - Intelligent cache warming with rate limiting
+    - Cache warming paced only by the shared adaptive Gemini rate limiter
     - Graceful fallbacks
+    - Several poem variants per rant, never served back to back
+    - Non-blocking start: warm-up runs on the worker thread, with readiness
+      reported separately from liveness
+    - Optional on-disk snapshots so restarts come up warm
+    - Event-driven refill paced by the measured request arrival rate
+    - Pool of generation workers fed from a shared work queue, with rants
+      prefetched from the scraper while poem calls are in flight
     """
     
-    def __init__(self, target_cache_size=10, min_cache_size=3):
+    def __init__(self, target_cache_size=10, min_cache_size=3, max_rant_attempts=5, batch_size=4,
+                 variants_per_rant=None, gemini_max_wait=300.0, idle_check_interval=60.0,
+                 snapshot_path=None, snapshot_interval=60.0, snapshot_ttl=None,
+                 generation_workers=None, prefetch_size=None):
         """
         Initialize cache with reduced sizes for Gemini AI rate limits
         target_cache_size: Reduced from 20 to 10
         min_cache_size: Reduced from 5 to 3
+        max_rant_attempts: rants to try before giving up when all were already seen
+        batch_size: cache items generated per Gemini request when refilling
+        variants_per_rant: poems requested per rant; each is cached as its own item
+        gemini_max_wait: how long cache fills wait on the Gemini rate limiter for a slot
+        idle_check_interval: longest the worker idles without being woken by demand
+        snapshot_path: gzip JSON file the cache is saved to and restored from (disabled if None)
+        snapshot_interval: seconds between periodic snapshots
+        snapshot_ttl: restored items older than this many seconds are dropped (default 6 hours)
+        generation_workers: threads generating batches concurrently (all share the Gemini rate limiter)
+        prefetch_size: rants scraped ahead of the generation workers
         """
         self.target_cache_size = target_cache_size
         self.min_cache_size = min_cache_size
+        self.max_rant_attempts = max_rant_attempts
+        self.batch_size = batch_size
+        self.variants_per_rant = max(1, variants_per_rant or int(os.getenv('POEM_VARIANTS_PER_RANT', 2)))
+        self.gemini_max_wait = gemini_max_wait
+        self.idle_check_interval = idle_check_interval
+        self.snapshot_path = snapshot_path or os.getenv('CACHE_SNAPSHOT_PATH') or None
+        self.snapshot_interval = snapshot_interval
+        self.snapshot_ttl = snapshot_ttl or float(os.getenv('CACHE_SNAPSHOT_TTL_SECONDS', 21600))
+        self._snapshot_digest = None
+        self.generation_workers = max(1, generation_workers or int(os.getenv('CACHE_GENERATION_WORKERS', 2)))
+        self.prefetch_size = prefetch_size or self.batch_size * self.generation_workers
+        
+        # Posts already turned into poems, shared with the scraper
+        self.seen_index = get_seen_index()
+        
+        # Near-duplicate rants are dropped or mapped to the poem already generated
+        self.near_duplicates = get_near_duplicate_index()
+        self.near_duplicate_mode = os.getenv('NEAR_DUPLICATE_MODE', 'map')
         
         # Thread-safe cache storage
         self._cache_lock = threading.RLock()
         self._hot_cache = deque(maxlen=target_cache_size)  # Ready-to-serve items
-        self._generating = False  # Flag to prevent multiple background jobs
+        self._generating = False  # True while any worker is generating a batch
+        self._refill_needed = threading.Event()  # Wakes the scheduler when the cache runs low
+        
+        # Refill jobs (item counts) for the generation workers, and rants scraped ahead of them
+        self._work_queue = queue.Queue(maxsize=self.generation_workers)
+        self._rant_queue = queue.Queue(maxsize=self.prefetch_size)
+        self._pending_items = 0  # Items queued or being generated
+        self._active_jobs = 0
+        
+        # Request arrival rate, as an EWMA of the gap between cache requests
+        self.arrival_alpha = 0.2
+        self._mean_interarrival = None
+        self._last_arrival = None
+        self._last_served_rant_id = None  # Variants of one rant are never served consecutively
         
         # Statistics
         self.stats = {
@@ -52,136 +109,333 @@ class RantPoemCache:
             'generation_attempts': 0,
             'generation_successes': 0,
             'generation_failures': 0,
+            'duplicates_skipped': 0,
+            'repeats_selected': 0,
+            'near_duplicates_mapped': 0,
+            'variants_generated': 0,
+            'snapshot_restored': 0,
+            'snapshot_expired': 0,
+            'snapshots_saved': 0,
+            'refill_wakeups': 0,
+            'rants_prefetched': 0,
             'last_generated': None,
             'cache_size': 0
         }
         
-        # Initialize scrapers
-        try:
-            if os.getenv('REDDIT_CLIENT_ID') and os.getenv('REDDIT_CLIENT_SECRET'):
-                self.scraper = RedditRantScraper()
-                self.using_live_data = True
-                logger.info("✅ Using live Reddit data for cache")
-            else:
-                self.scraper = FallbackRantScraper()
-                self.using_live_data = False
-                logger.info("⚠️ Using fallback data for cache")
-        except Exception as e:
-            logger.error(f"❌ Error initializing scraper: {e}")
-            self.scraper = FallbackRantScraper()
-            self.using_live_data = False
+        # Shared process-wide scraper (one Reddit client and rate-limit budget)
+        self.scraper = get_scraper()
+        self.using_live_data = self.scraper.using_live_data
+        logger.info(f"{'✅ Using live Reddit data' if self.using_live_data else '⚠️ Using fallback data'} for cache")
         
-        # Background worker thread
+        # Background threads: the refill scheduler, the generation workers and the rant prefetcher
         self._worker_thread = None
+        self._generation_threads = []
+        self._prefetch_thread = None
         self._stop_worker = threading.Event()
         
-        # Start the background cache warming
-        self.start_background_worker()
+        # Set once the initial warm-up has run (successfully or not)
+        self._warmed_up = threading.Event()
+        self.warmup_items = min(2, self.min_cache_size)  # Reduced from 3
+        
+        # Come up warm from the last snapshot, then keep saving it
+        self._snapshot_thread = None
+        if self.snapshot_path:
+            self.load_snapshot()
+            atexit.register(self.save_snapshot)
         
-        # Initial cache warm-up (blocking) - reduced for rate limits
-        self._initial_warmup()
+        # Start the background cache warming; the worker runs the initial warm-up first,
+        # so construction returns immediately and the app can start serving
+        self.start_background_worker()
     
     def _initial_warmup(self):
-        """Initial synchronous cache warming to ensure we have some content"""
+        """Initial cache warming, run on the worker thread, to get some content in quickly"""
         logger.info("🔥 Starting initial cache warm-up (reduced for Gemini rate limits)...")
         
-        # Generate fewer items synchronously for immediate availability
-        warmup_items = min(2, self.min_cache_size)  # Reduced from 3
-        for i in range(warmup_items):
-            try:
-                item = self._generate_single_item()
-                if item:
-                    with self._cache_lock:
-                        self._hot_cache.append(item)
-                    logger.info(f"✅ Initial warm-up item {i+1}/{warmup_items} generated")
-                else:
-                    logger.warning(f"⚠️ Failed to generate initial warm-up item {i+1}")
-                
-                # Add delay between initial generations for rate limiting
-                if i < warmup_items - 1:
-                    time.sleep(10)  # 10 second delay between initial generations
-                    
-            except Exception as e:
-                logger.error(f"❌ Error during initial warm-up: {e}")
+        # Generate a few items for immediate availability, in one batch
+        warmup_items = self.warmup_items
+        try:
+            items = self._generate_items(warmup_items)
+            with self._cache_lock:
+                self._hot_cache.extend(items)
+            logger.info(f"✅ Initial warm-up generated {len(items)}/{warmup_items} items")
+        except Exception as e:
+            logger.error(f"❌ Error during initial warm-up: {e}")
+        finally:
+            self._warmed_up.set()
         
         logger.info(f"🎯 Initial warm-up complete. Cache size: {len(self._hot_cache)}")
     
+    def is_ready(self) -> bool:
+        """
+        Ready to take traffic: the cache holds the warm-up depth, or warm-up has
+        finished (a failed warm-up should not keep the instance out of rotation;
+        misses are still served on demand)
+        """
+        with self._cache_lock:
+            depth = len(self._hot_cache)
+        return depth >= self.warmup_items or self._warmed_up.is_set()
+    
+    def wait_until_warm(self, timeout: float = None) -> bool:
+        """Block until the initial warm-up has run. Returns False on timeout."""
+        return self._warmed_up.wait(timeout)
+    
+    def is_alive(self) -> bool:
+        """Live while the refill scheduler and at least one generation worker are running"""
+        return bool(self._worker_thread and self._worker_thread.is_alive()
+                    and any(thread.is_alive() for thread in self._generation_threads))
+    
+    def get_readiness(self) -> Dict:
+        """Readiness and liveness details, including the current cache depth"""
+        with self._cache_lock:
+            depth = len(self._hot_cache)
+        return {
+            'ready': self.is_ready(),
+            'live': self.is_alive(),
+            'warmed_up': self._warmed_up.is_set(),
+            'cache_size': depth,
+            'ready_cache_size': self.warmup_items,
+            'target_cache_size': self.target_cache_size
+        }
+    
     def get_cached_rant_poem(self) -> Optional[Dict]:
         """
         Get a pre-generated rant-poem pair instantly
         Returns None if cache is empty
         """
         with self._cache_lock:
+            self._record_arrival()
             if self._hot_cache:
-                item = self._hot_cache.popleft()
+                item = self._pop_next_item()
                 self.stats['cache_hits'] += 1
                 self.stats['cache_size'] = len(self._hot_cache)
                 
                 logger.info(f"🚀 Cache hit! Serving instant result. Remaining: {len(self._hot_cache)}")
                 
-                # Trigger background refill if cache is getting low
+                # Trigger background refill if cache is getting low; any pop below
+                # target wakes the scheduler so it re-paces against current demand
                 if len(self._hot_cache) < self.min_cache_size:
                     self._trigger_background_generation()
+                elif len(self._hot_cache) + self._pending_items < self.target_cache_size:
+                    self._refill_needed.set()
                 
                 return item
             else:
                 self.stats['cache_misses'] += 1
                 logger.warning("💔 Cache miss! No pre-generated content available")
+                self._trigger_background_generation()
                 return None
     
-    def _generate_single_item(self) -> Optional[Dict]:
-        """Generate a single rant-poem pair"""
-        try:
-            self.stats['generation_attempts'] += 1
+    def _count(self, key: str, n: int = 1):
+        """Bump a stats counter; the generation workers, prefetcher and scheduler share them"""
+        with self._cache_lock:
+            self.stats[key] += n
+    
+    def _record_arrival(self):
+        """Fold one cache request into the arrival-rate EWMA (caller holds the lock)"""
+        now = time.monotonic()
+        if self._last_arrival is not None:
+            gap = now - self._last_arrival
+            if self._mean_interarrival is None:
+                self._mean_interarrival = gap
+            else:
+                self._mean_interarrival += self.arrival_alpha * (gap - self._mean_interarrival)
+        self._last_arrival = now
+    
+    def arrival_rate(self) -> float:
+        """Estimated cache requests per second; decays while no requests arrive"""
+        with self._cache_lock:
+            if self._mean_interarrival is None:
+                return 0.0
+            gap = max(self._mean_interarrival, time.monotonic() - self._last_arrival)
+        return 1.0 / gap if gap > 0 else 0.0
+    
+    def _refill_delay(self, current_size: int) -> float:
+        """
+        How long to wait before the next batch. Below min_cache_size: none.
+        Otherwise one batch per expected batch worth of requests, so refill
+        speed follows demand; with no demand, wait until woken.
+        """
+        if current_size < self.min_cache_size:
+            return 0.0
+        rate = self.arrival_rate()
+        if rate <= 0:
+            return self.idle_check_interval
+        return min(self.batch_size / rate, self.idle_check_interval)
+    
+    def _pop_next_item(self) -> Dict:
+        """Pop the oldest item whose rant differs from the one served last (caller holds the lock)"""
+        index = next(
+            (i for i, item in enumerate(self._hot_cache) if item.get('rant_id') != self._last_served_rant_id),
+            0  # Only variants of the last rant are left; serve one rather than miss
+        )
+        item = self._hot_cache[index]
+        del self._hot_cache[index]
+        self._last_served_rant_id = item.get('rant_id')
+        return item
+    
+    def _select_rant(self, use_ai: bool):
+        """
+        Pick a rant worth a poem, skipping ones already spent on an AI poem within
+        the seen window. Returns (rant, duplicate_of) where duplicate_of holds the
+        existing poem of a near-duplicate rant, if any.
+        When the scraper has nothing unseen (e.g. the two fallback samples), a
+        repeat is returned rather than starving the cache; its poem comes from
+        the poem memo or the near-duplicate index without a new Gemini call.
+        """
+        repeat = None
+        for _ in range(self.max_rant_attempts):
+            candidate = self.scraper.get_random_rant()
+            if not candidate:
+                break
+            if use_ai and not self.seen_index.check_and_add(candidate):
+                self._count('duplicates_skipped')
+                repeat = repeat or candidate
+                continue
             
-            # Get a rant
-            rant = self.scraper.get_random_rant()
+            # Reworded reposts either get skipped or reuse the earlier poem
+            duplicate_of = self.near_duplicates.find(self.near_duplicates.text_for(candidate)) if use_ai else None
+            if duplicate_of and self.near_duplicate_mode == 'drop':
+                self._count('duplicates_skipped')
+                repeat = repeat or candidate
+                continue
+            return candidate, duplicate_of
+        
+        if repeat is not None:
+            self._count('repeats_selected')
+            return repeat, self.near_duplicates.find(self.near_duplicates.text_for(repeat))
+        return None, None
+    
+    def _take_rants(self, count: int, use_ai: bool) -> List:
+        """
+        Take up to count rants for generation as (rant, duplicate_of) pairs,
+        prefetched ones first, selecting the rest directly
+        """
+        selected = []
+        while len(selected) < count:
+            try:
+                selected.append(self._rant_queue.get_nowait())
+            except queue.Empty:
+                break
+        while len(selected) < count:
+            rant, duplicate_of = self._select_rant(use_ai)
             if not rant:
-                logger.warning("⚠️ No rant available from scraper")
-                return None
+                break
+            selected.append((rant, duplicate_of))
+        return selected
+    
+    def _prefetch_worker(self):
+        """Background thread that keeps rants selected ahead of the generation workers"""
+        use_ai = ai_configured()
+        while not self._stop_worker.is_set():
+            try:
+                selected = self._select_rant(use_ai)
+            except Exception as e:
+                logger.error(f"❌ Rant prefetch error: {e}")
+                selected = (None, None)
+            if selected[0] is None:
+                self._stop_worker.wait(5)  # Scraper has nothing new; try again shortly
+                continue
+            
+            while not self._stop_worker.is_set():
+                try:
+                    self._rant_queue.put(selected, timeout=1)
+                    self._count('rants_prefetched')
+                    break
+                except queue.Full:
+                    continue
+    
+    def _generate_items(self, count: int) -> List[Dict]:
+        """
+        Generate about count rant-poem items, sharing one Gemini request between them.
+        Each rant gets up to variants_per_rant poems, each cached as its own item
+        tagged with the rant's ID. Every variant is kept, so a count that is not a
+        multiple of the variants can return a few more items than asked for.
+        """
+        try:
+            self._count('generation_attempts', count)
+            use_ai = ai_configured()
+            variants = self.variants_per_rant if use_ai else 1
             
-            # Generate poem with Gemini AI
-            full_rant_text = f"{rant['title']}. {rant['content']}"
+            selected = [
+                (rant, duplicate_of, f"{rant['title']}. {rant['content']}")
+                for rant, duplicate_of in self._take_rants(-(-count // variants), use_ai)
+            ]
             
-            # Check if Gemini AI is available
-            if os.getenv('GEMINI_API_KEY'):
+            if not selected:
+                logger.warning("⚠️ No unseen rant available from scraper")
+                self._count('generation_failures', count)
+                return []
+            
+            # One batched Gemini request for every rant without an existing poem
+            ai_poems = {}
+            if use_ai:
+                fresh = [i for i, (_, duplicate_of, _) in enumerate(selected) if not duplicate_of]
                 try:
-                    poem = convert_rant_to_poem_gemini(full_rant_text)
-                    
-                    # Check if AI generation actually worked
-                    if poem.startswith("Error:") or poem.startswith("The muses are silent"):
-                        logger.warning(f"⚠️ Gemini AI generation failed: {poem[:50]}...")
-                        poem = self._generate_fallback_poem(full_rant_text)
-                        is_ai = False
-                    else:
-                        is_ai = True
-                        logger.info("🤖 Gemini AI poem generated successfully")
+                    batch = convert_rants_to_poem_variants_gemini(
+                        [selected[i][2] for i in fresh], variants, max_wait=self.gemini_max_wait
+                    )
+                    ai_poems = {i: poems for i, poems in zip(fresh, batch) if poems}
                 except Exception as e:
                     logger.error(f"❌ Gemini AI generation error: {e}")
-                    poem = self._generate_fallback_poem(full_rant_text)
+                if fresh:
+                    generated = sum(len(poems) for poems in ai_poems.values())
+                    self._count('variants_generated', generated)
+                    logger.info(f"🤖 Gemini AI batch generated {generated}/{len(fresh) * variants} poems")
+            
+            per_rant = []
+            for i, (rant, duplicate_of, full_rant_text) in enumerate(selected):
+                if duplicate_of:
+                    poems = [duplicate_of['poem']]
+                    is_ai = True
+                    self._count('near_duplicates_mapped')
+                    logger.info("♻️ Near-duplicate rant, reusing its existing poem")
+                elif i in ai_poems:
+                    poems = ai_poems[i]
+                    is_ai = True
+                    self.near_duplicates.add(self.near_duplicates.text_for(rant), {'poem': poems[0]})
+                else:
+                    if use_ai:
+                        logger.warning("⚠️ Gemini AI generation failed, using fallback poem")
+                    poems = [self._generate_fallback_poem(full_rant_text)]
                     is_ai = False
-            else:
-                poem = self._generate_fallback_poem(full_rant_text)
-                is_ai = False
+                
+                # Create one cached item per variant, linked by the rant ID
+                rant_id = self.seen_index.key_for(rant) or uuid.uuid4().hex
+                per_rant.append([{
+                    'rant': rant,
+                    'poem': poem,
+                    'is_ai': is_ai,
+                    'rant_id': rant_id,
+                    'variant': variant,
+                    'generated_at': datetime.now().isoformat(),
+                    'using_live_data': self.using_live_data
+                } for variant, poem in enumerate(poems, start=1)])
             
-            # Create the cached item
-            cached_item = {
-                'rant': rant,
-                'poem': poem,
-                'is_ai': is_ai,
-                'generated_at': datetime.now().isoformat(),
-                'using_live_data': self.using_live_data
-            }
+            # Interleave variants across rants so neighbours in the cache differ
+            items = [
+                group[v] for v in range(max(len(group) for group in per_rant))
+                for group in per_rant if v < len(group)
+            ]
             
-            self.stats['generation_successes'] += 1
-            self.stats['last_generated'] = datetime.now().isoformat()
+            with self._cache_lock:
+                self.stats['generation_successes'] += len(items)
+                self.stats['generation_failures'] += max(0, count - len(items))
+                self.stats['last_generated'] = datetime.now().isoformat()
             
-            return cached_item
+            return items
             
         except Exception as e:
-            logger.error(f"❌ Error generating cache item: {e}")
-            self.stats['generation_failures'] += 1
-            return None
+            logger.error(f"❌ Error generating cache items: {e}")
+            self._count('generation_failures', count)
+            return []
+    
+    def _generate_single_item(self) -> Optional[Dict]:
+        """Generate a single rant-poem pair, caching any other variants of its rant"""
+        items = self._generate_items(1)
+        if len(items) > 1:
+            with self._cache_lock:
+                self._hot_cache.extend(items[1:])
+        return items[0] if items else None
     
     def _generate_fallback_poem(self, rant_text: str) -> str:
         """Generate a simple template-based poem as fallback"""
@@ -208,36 +462,56 @@ Lies poetry for all the world to see."""
         return random.choice(poem_templates)
     
     def _background_worker(self):
-        """Background thread that continuously fills the cache with increased delays for Gemini rate limits"""
+        """
+        Background scheduler thread that keeps the cache filled.
+        It queues refill jobs for the generation workers; Gemini pacing comes
+        from the shared adaptive rate limiter, and refill pacing from demand.
+        """
         logger.info("🔄 Background cache worker started (Gemini AI rate-limited mode)")
         
+        if not self._warmed_up.is_set():
+            with self._cache_lock:
+                restored = len(self._hot_cache)
+            if restored >= self.warmup_items:
+                logger.info(f"♨️ Skipping initial warm-up, {restored} items restored from snapshot")
+                self._warmed_up.set()
+            else:
+                self._initial_warmup()
+        
+        last_queued = 0.0
         while not self._stop_worker.is_set():
             try:
-                # Check if we need to generate more items
-                with self._cache_lock:
-                    current_size = len(self._hot_cache)
+                # Urgency follows what is servable now; the target also counts items
+                # already queued or in flight so jobs are not over-issued
+                cached, current_size = self._cache_depths()
                 
-                if current_size < self.target_cache_size:
-                    logger.info(f"🎯 Cache below target ({current_size}/{self.target_cache_size}), generating new item...")
-                    
-                    item = self._generate_single_item()
-                    if item:
-                        with self._cache_lock:
-                            self._hot_cache.append(item)
-                        logger.info(f"✅ Added item to cache. New size: {len(self._hot_cache)}")
-                    else:
-                        logger.warning("⚠️ Failed to generate cache item")
-                
-                # Increased sleep times for Gemini AI rate limits
+                # Full: sleep until a request takes the cache below target. Above the
+                # low-water mark: pace batches by demand, recomputing the delay on every
+                # wake-up. Below min_cache_size the delay is zero.
                 if current_size >= self.target_cache_size:
-                    sleep_time = 60   # 60 seconds when cache is full (increased from 30)
-                elif current_size < self.min_cache_size:
-                    sleep_time = 15   # 15 seconds when cache is critically low (increased from 5)
+                    delay = self.idle_check_interval
                 else:
-                    sleep_time = 30   # 30 seconds when cache is moderate (increased from 15)
+                    delay = self._refill_delay(cached) - (time.monotonic() - last_queued)
+                if delay > 0:
+                    self._refill_needed.wait(delay)
+                    self._refill_needed.clear()
+                    if self._cache_depths()[0] < self.min_cache_size:
+                        self._count('refill_wakeups')
+                    continue
+                
+                batch = self._job_size(min(self.batch_size, self.target_cache_size - current_size))
+                logger.info(f"🎯 Cache below target ({current_size}/{self.target_cache_size}), queueing {batch} new items...")
                 
-                logger.info(f"💤 Waiting {sleep_time}s before next generation (rate limiting)")
-                self._stop_worker.wait(sleep_time)
+                with self._cache_lock:
+                    self._pending_items += batch
+                last_queued = time.monotonic()
+                # Blocks while every worker already has a job waiting
+                while not self._stop_worker.is_set():
+                    try:
+                        self._work_queue.put(batch, timeout=1)
+                        break
+                    except queue.Full:
+                        continue
                 
             except Exception as e:
                 logger.error(f"❌ Background worker error: {e}")
@@ -245,59 +519,185 @@ Lies poetry for all the world to see."""
         
         logger.info("🔄 Background cache worker stopped")
     
+    def _job_size(self, needed: int) -> int:
+        """Round a refill job up to whole rants, so no generated variant goes unqueued"""
+        variants = self.variants_per_rant if ai_configured() else 1
+        return -(-needed // variants) * variants
+    
+    def _cache_depths(self):
+        """Returns (cached items, cached items plus items queued or being generated)"""
+        with self._cache_lock:
+            cached = len(self._hot_cache)
+            return cached, cached + self._pending_items
+    
+    def _generation_worker(self):
+        """Generation worker thread: turns queued refill jobs into cached items"""
+        while not self._stop_worker.is_set():
+            try:
+                batch = self._work_queue.get(timeout=1)
+            except queue.Empty:
+                continue
+            
+            with self._cache_lock:
+                self._active_jobs += 1
+                self._generating = True
+            items = []
+            try:
+                items = self._generate_items(batch)
+                if items:
+                    with self._cache_lock:
+                        self._hot_cache.extend(items)
+                    logger.info(f"✅ Added {len(items)} items to cache. New size: {len(self._hot_cache)}")
+            except Exception as e:
+                logger.error(f"❌ Generation worker error: {e}")
+            finally:
+                with self._cache_lock:
+                    self._pending_items -= batch
+                    self._active_jobs -= 1
+                    self._generating = self._active_jobs > 0
+            
+            if len(items) < batch:
+                # Let the scheduler re-queue the shortfall
+                self._refill_needed.set()
+            if not items:
+                logger.warning("⚠️ Failed to generate cache items")
+                self._stop_worker.wait(20)  # Nothing to generate from; back off before retrying
+    
     def _trigger_background_generation(self):
-        """Trigger background generation if not already running"""
-        if not self._generating:
-            self._generating = True
+        """Wake the background worker to refill now, unless it is already generating"""
+        if not self._generating and not self._refill_needed.is_set():
             logger.info("🚀 Triggered background cache generation")
-            # The background worker will pick this up automatically
+        self._refill_needed.set()
+    
+    def load_snapshot(self) -> int:
+        """Restore cached items from the snapshot file, dropping stale ones. Returns items restored."""
+        try:
+            with gzip.open(self.snapshot_path, 'rt', encoding='utf-8') as f:
+                snapshot = json.load(f)
+        except FileNotFoundError:
+            return 0
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Ignoring unreadable cache snapshot {self.snapshot_path}: {e}")
+            return 0
+        
+        cutoff = datetime.now() - timedelta(seconds=self.snapshot_ttl)
+        fresh = []
+        for item in snapshot.get('items', []):
+            try:
+                generated_at = datetime.fromisoformat(item['generated_at'])
+            except (KeyError, TypeError, ValueError):
+                continue
+            if generated_at >= cutoff:
+                fresh.append(item)
+        
+        # Restored rants count as used so refills do not generate them again
+        for item in fresh:
+            if item.get('is_ai'):
+                self.seen_index.check_and_add(item['rant'])
+                self.near_duplicates.add(self.near_duplicates.text_for(item['rant']), {'poem': item['poem']})
+        
+        with self._cache_lock:
+            self._hot_cache.extend(fresh)
+            self.stats['snapshot_restored'] += len(fresh)
+            self.stats['snapshot_expired'] += len(snapshot.get('items', [])) - len(fresh)
+        logger.info(f"♨️ Restored {len(fresh)} cached items from snapshot "
+                    f"({self.stats['snapshot_expired']} expired)")
+        return len(fresh)
+    
+    def save_snapshot(self) -> bool:
+        """Atomically write the cached items to the snapshot file if they changed. Returns True if written."""
+        if not self.snapshot_path:
+            return False
+        with self._cache_lock:
+            items = list(self._hot_cache)
+        payload = json.dumps({'saved_at': datetime.now().isoformat(), 'items': items},
+                             ensure_ascii=False, separators=(',', ':'))
+        digest = hashlib.sha256(json.dumps(items, sort_keys=True).encode('utf-8')).hexdigest()
+        if digest == self._snapshot_digest:
+            return False
+        
+        tmp_path = f"{self.snapshot_path}.tmp"
+        try:
+            with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+                f.write(payload)
+            os.replace(tmp_path, self.snapshot_path)
+        except OSError as e:
+            logger.error(f"❌ Failed to save cache snapshot: {e}")
+            return False
+        self._snapshot_digest = digest
+        self._count('snapshots_saved')
+        return True
+    
+    def _snapshot_worker(self):
+        """Background thread that saves a snapshot every snapshot_interval seconds"""
+        while not self._stop_worker.wait(self.snapshot_interval):
+            self.save_snapshot()
     
     def start_background_worker(self):
-        """Start the background cache worker thread"""
+        """Start the refill scheduler, generation workers, rant prefetcher and (if enabled) snapshot threads"""
         if self._worker_thread and self._worker_thread.is_alive():
             return
         
         self._stop_worker.clear()
         self._worker_thread = threading.Thread(target=self._background_worker, daemon=True)
         self._worker_thread.start()
+        self._generation_threads = [
+            threading.Thread(target=self._generation_worker, daemon=True, name=f"cache-generator-{i}")
+            for i in range(self.generation_workers)
+        ]
+        for thread in self._generation_threads:
+            thread.start()
+        self._prefetch_thread = threading.Thread(target=self._prefetch_worker, daemon=True, name="cache-prefetch")
+        self._prefetch_thread.start()
+        if self.snapshot_path:
+            self._snapshot_thread = threading.Thread(target=self._snapshot_worker, daemon=True)
+            self._snapshot_thread.start()
         logger.info("🔄 Background cache worker started")
     
     def stop_background_worker(self):
-        """Stop the background cache worker thread"""
+        """Stop the background cache worker thread, saving a final snapshot if enabled"""
         if self._worker_thread and self._worker_thread.is_alive():
             self._stop_worker.set()
+            self._refill_needed.set()  # Wake the worker if it is idling
             self._worker_thread.join(timeout=5)
+            for thread in self._generation_threads + [self._prefetch_thread]:
+                if thread:
+                    thread.join(timeout=5)
             logger.info("🔄 Background cache worker stopped")
+        if getattr(self, 'snapshot_path', None):
+            self.save_snapshot()
+            atexit.unregister(self.save_snapshot)
     
     def get_cache_stats(self) -> Dict:
         """Get cache statistics"""
         with self._cache_lock:
             self.stats['cache_size'] = len(self._hot_cache)
-        
-        return self.stats.copy()
+            stats = self.stats.copy()
+        stats['arrival_rate_per_minute'] = round(self.arrival_rate() * 60, 2)
+        stats['generating'] = self._generating
+        stats['pending_items'] = self._pending_items
+        stats['generation_workers'] = self.generation_workers
+        stats['prefetched_rants'] = self._rant_queue.qsize()
+        return stats
     
     def warm_cache(self, count: int = None) -> int:
-        """Manually warm the cache with specified number of items (with rate limiting)"""
+        """Manually warm the cache with specified number of items (paced by the Gemini rate limiter)"""
         if count is None:
             count = self.target_cache_size
         
         logger.info(f"🔥 Manual cache warming: generating {count} items with rate limiting...")
         
         generated = 0
-        for i in range(count):
-            item = self._generate_single_item()
-            if item:
+        for start in range(0, count, self.batch_size):
+            batch = min(self.batch_size, count - start)
+            items = self._generate_items(batch)
+            if items:
                 with self._cache_lock:
-                    self._hot_cache.append(item)
-                generated += 1
-                logger.info(f"✅ Generated cache item {i+1}/{count}")
+                    self._hot_cache.extend(items)
+                generated += len(items)
+                logger.info(f"✅ Generated cache items {start + 1}-{start + batch}/{count}")
             else:
-                logger.warning(f"⚠️ Failed to generate cache item {i+1}/{count}")
-            
-            # Add delay between manual generations for rate limiting
-            if i < count - 1:
-                logger.info(f"💤 Rate limiting: waiting 10s before next generation...")
-                time.sleep(10)
+                logger.warning(f"⚠️ Failed to generate cache items {start + 1}-{start + batch}/{count}")
         
         logger.info(f"🎯 Cache warming complete: {generated}/{count} items generated")
         return generated
@@ -307,6 +707,7 @@ Lies poetry for all the world to see."""
         with self._cache_lock:
             self._hot_cache.clear()
         logger.info("🗑️ Cache cleared")
+        self._trigger_background_generation()
     
     def __del__(self):
         """Cleanup when cache manager is destroyed"""
@@ -337,6 +738,7 @@ if __name__ == "__main__":
     print("=" * 50)
     
     cache = RantPoemCache(target_cache_size=5, min_cache_size=2)
+    cache.wait_until_warm(timeout=60)
     
     # Test getting cached items
     for i in range(5):  # Reduced test iterations
@@ -0,0 +1,208 @@
+"""
+Deduplication for Reddit Rant Roulette
+Tracks which posts have already been turned into poems so cache fills
+never spend a Gemini call on a repeat, and spots near-duplicate rants
+reposted across subreddits with small wording changes
+"""
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, Optional
+
+
+class SeenPostIndex:
+    """
+    Bounded, time-windowed LRU set of post keys
+    Features:
+    - Keys expire after a configurable window
+    - Oldest keys are evicted once max_size is reached
+    - Atomic check-and-add so concurrent fillers never both claim a post
+    """
+
+    def __init__(self, max_size: int = 5000, window: float = 3600):
+        self.max_size = max_size
+        self.window = window
+        self._lock = threading.Lock()
+        self._seen = OrderedDict()  # key -> time first seen
+        self.stats = {'checks': 0, 'repeats': 0, 'evictions': 0}
+
+    @staticmethod
+    def key_for(rant: Dict) -> Optional[str]:
+        """Stable key for a rant: Reddit post ID, falling back to its URL."""
+        return rant.get('id') or rant.get('url')
+
+    def _expire(self, now: float):
+        """Drop keys older than the window (oldest are at the front)."""
+        cutoff = now - self.window
+        while self._seen:
+            key, seen_at = next(iter(self._seen.items()))
+            if seen_at >= cutoff:
+                break
+            self._seen.popitem(last=False)
+
+    def seen(self, rant: Dict) -> bool:
+        """Check whether a rant was seen within the window."""
+        key = self.key_for(rant)
+        with self._lock:
+            self.stats['checks'] += 1
+            self._expire(time.time())
+            if key in self._seen:
+                self.stats['repeats'] += 1
+                return True
+            return False
+
+    def check_and_add(self, rant: Dict) -> bool:
+        """Mark a rant as seen. Returns False if it was already seen within the window."""
+        key = self.key_for(rant)
+        if key is None:
+            return True
+        now = time.time()
+        with self._lock:
+            self.stats['checks'] += 1
+            self._expire(now)
+            if key in self._seen:
+                self.stats['repeats'] += 1
+                return False
+            self._seen[key] = now
+            while len(self._seen) > self.max_size:
+                self._seen.popitem(last=False)
+                self.stats['evictions'] += 1
+            return True
+
+    def get_stats(self) -> Dict:
+        """Get index size and repeat counters."""
+        with self._lock:
+            return {**self.stats, 'size': len(self._seen), 'window_seconds': self.window}
+
+
+class NearDuplicateIndex:
+    """
+    SimHash fingerprints with LSH band buckets
+    Features:
+    - 64-bit SimHash over the words and word pairs of the cleaned text
+    - Tunable similarity threshold (1 - hamming distance / 64)
+    - Bands chosen so any pair within the threshold shares a bucket
+    - Each fingerprint carries a payload (e.g. the poem already generated)
+    """
+
+    BITS = 64
+
+    def __init__(self, threshold: float = 0.85, max_size: int = 5000):
+        self.threshold = threshold
+        self.max_distance = int((1 - threshold) * self.BITS)
+
+        # Pigeonhole: with max_distance + 1 bands, two fingerprints within
+        # max_distance bits must agree exactly on at least one band
+        self.bands = min(self.max_distance + 1, self.BITS)
+        self._band_width = self.BITS // self.bands
+        self.max_size = max_size
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # fingerprint -> payload
+        self._buckets = defaultdict(set)  # (band, value) -> fingerprints
+        self.stats = {'lookups': 0, 'matches': 0}
+
+    @staticmethod
+    def text_for(rant: Dict) -> str:
+        """Text a rant is fingerprinted on."""
+        return f"{rant.get('title', '')} {rant.get('content', '')}"
+
+    def fingerprint(self, text: str) -> int:
+        """Compute the 64-bit SimHash of a text."""
+        tokens = re.findall(r'\w+', text.lower())
+        shingles = set(tokens) | {f"{a} {b}" for a, b in zip(tokens, tokens[1:])}
+        hashes = [
+            format(int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), 'big'), '064b')
+            for s in shingles
+        ]
+        if not hashes:
+            return 0
+
+        # Majority vote per bit position, counted column-wise over the bit strings
+        fingerprint = 0
+        for position, column in enumerate(zip(*hashes)):
+            if 2 * column.count('1') > len(hashes):
+                fingerprint |= 1 << (self.BITS - 1 - position)
+        return fingerprint
+
+    def _band_keys(self, fingerprint: int):
+        mask = (1 << self._band_width) - 1
+        return [(band, (fingerprint >> (band * self._band_width)) & mask) for band in range(self.bands)]
+
+    def similarity(self, a: int, b: int) -> float:
+        """Similarity of two fingerprints in [0, 1]."""
+        return 1 - bin(a ^ b).count('1') / self.BITS
+
+    def find(self, text: str) -> Optional[Any]:
+        """Return the payload of a stored near-duplicate of text, if any."""
+        fingerprint = self.fingerprint(text)
+        with self._lock:
+            self.stats['lookups'] += 1
+            best, best_distance = None, self.max_distance + 1
+            for key in self._band_keys(fingerprint):
+                for candidate in self._buckets.get(key, ()):
+                    distance = bin(candidate ^ fingerprint).count('1')
+                    if distance < best_distance:
+                        best, best_distance = candidate, distance
+            if best is None:
+                return None
+            self.stats['matches'] += 1
+            self._entries.move_to_end(best)
+            return self._entries[best]
+
+    def add(self, text: str, payload: Any = True):
+        """Index a text with the payload near-duplicates should map to."""
+        fingerprint = self.fingerprint(text)
+        with self._lock:
+            if fingerprint not in self._entries:
+                for key in self._band_keys(fingerprint):
+                    self._buckets[key].add(fingerprint)
+            self._entries[fingerprint] = payload
+            self._entries.move_to_end(fingerprint)
+
+            while len(self._entries) > self.max_size:
+                evicted, _ = self._entries.popitem(last=False)
+                for key in self._band_keys(evicted):
+                    bucket = self._buckets[key]
+                    bucket.discard(evicted)
+                    if not bucket:
+                        del self._buckets[key]
+
+    def get_stats(self) -> Dict:
+        """Get index size and match counters."""
+        with self._lock:
+            return {**self.stats, 'size': len(self._entries), 'threshold': self.threshold}
+
+
+# Global seen-post index shared by the scraper and the cache
+_seen_index = None
+_seen_index_lock = threading.Lock()
+
+def get_seen_index() -> SeenPostIndex:
+    """Get the process-wide seen-post index"""
+    global _seen_index
+    with _seen_index_lock:
+        if _seen_index is None:
+            _seen_index = SeenPostIndex(
+                max_size=int(os.getenv('SEEN_INDEX_SIZE', 5000)),
+                window=float(os.getenv('SEEN_WINDOW_SECONDS', 3600))
+            )
+        return _seen_index
+
+
+# Global near-duplicate index shared by the scraper and the cache
+_near_duplicate_index = None
+
+def get_near_duplicate_index() -> NearDuplicateIndex:
+    """Get the process-wide near-duplicate index"""
+    global _near_duplicate_index
+    with _seen_index_lock:
+        if _near_duplicate_index is None:
+            _near_duplicate_index = NearDuplicateIndex(
+                threshold=float(os.getenv('NEAR_DUPLICATE_THRESHOLD', 0.85)),
+                max_size=int(os.getenv('SEEN_INDEX_SIZE', 5000))
+            )
+        return _near_duplicate_index
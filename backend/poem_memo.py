@@ -0,0 +1,120 @@
+"""
+Poem Memoization for Reddit Rant Roulette
+Content-addressed cache of generated poems so the same rant text is never
+sent to Gemini twice
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+def normalize_rant_text(text: str) -> str:
+    """Normalize rant text so trivially different copies share a key."""
+    return re.sub(r'\s+', ' ', unicodedata.normalize('NFC', text)).strip()
+
+
+def memo_key(rant_text: str, prompt_version: str) -> str:
+    """Content address of a rant under a given prompt version."""
+    payload = f"{prompt_version}\x00{normalize_rant_text(rant_text)}"
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class PoemMemo:
+    """
+    Two-tier poem memo
+    Features:
+    - Bounded in-memory LRU tier
+    - Optional SQLite tier on disk that survives restarts
+    - Disk hits are promoted back into memory
+    - Hit/miss counters per tier
+    """
+
+    def __init__(self, max_entries: int = 512, disk_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.disk_path = disk_path
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()  # key -> poem
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'stores': 0}
+
+        self._conn = None
+        if disk_path:
+            self._conn = sqlite3.connect(disk_path, check_same_thread=False)
+            with self._conn:
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute("""
+                    CREATE TABLE IF NOT EXISTS poems (
+                        key TEXT PRIMARY KEY,
+                        poem TEXT NOT NULL,
+                        created_at REAL
+                    )
+                """)
+
+    def _remember(self, key: str, poem: str):
+        """Insert into the memory tier, evicting the least recently used entry."""
+        self._memory[key] = poem
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        """Look a poem up in memory, then on disk."""
+        with self._lock:
+            poem = self._memory.get(key)
+            if poem is not None:
+                self._memory.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                return poem
+
+            if self._conn is not None:
+                row = self._conn.execute("SELECT poem FROM poems WHERE key = ?", (key,)).fetchone()
+                if row:
+                    self._remember(key, row[0])
+                    self.stats['disk_hits'] += 1
+                    return row[0]
+
+            self.stats['misses'] += 1
+            return None
+
+    def put(self, key: str, poem: str):
+        """Store a poem in memory and, if enabled, on disk."""
+        with self._lock:
+            self._remember(key, poem)
+            self.stats['stores'] += 1
+            if self._conn is not None:
+                with self._conn:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO poems (key, poem, created_at) VALUES (?, ?, ?)",
+                        (key, poem, time.time())
+                    )
+
+    def get_stats(self) -> Dict:
+        """Get hit/miss counters and tier sizes."""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['memory_size'] = len(self._memory)
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_ratio'] = round((stats['memory_hits'] + stats['disk_hits']) / lookups, 3) if lookups else None
+        stats['disk_enabled'] = self._conn is not None
+        return stats
+
+
+# Global poem memo shared by every caller of the poem generator
+_poem_memo = None
+_poem_memo_lock = threading.Lock()
+
+def get_poem_memo() -> PoemMemo:
+    """Get the process-wide poem memo"""
+    global _poem_memo
+    with _poem_memo_lock:
+        if _poem_memo is None:
+            _poem_memo = PoemMemo(
+                max_entries=int(os.getenv('POEM_MEMO_SIZE', 512)),
+                disk_path=os.getenv('POEM_MEMO_PATH') or None
+            )
+        return _poem_memo
@@ -0,0 +1,122 @@
+"""
+Prompt Shaping for Reddit Rant Roulette
+Keeps long rants inside a token budget before they are sent to Gemini,
+and records per-call input sizes next to latency
+"""
+import math
+import os
+import re
+import threading
+from collections import deque
+from typing import Dict, List
+
+from rant_classifier import RantClassifier
+
+# Gemini averages roughly four characters of English per token
+CHARS_PER_TOKEN = 4
+
+_SENTENCE_BREAK = re.compile(r'(?<=[.!?])\s+|\n+')
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate with no tokenizer round trip."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split text into sentences on terminal punctuation and line breaks."""
+    return [sentence.strip() for sentence in _SENTENCE_BREAK.split(text) if sentence.strip()]
+
+
+class PromptShaper:
+    """
+    Token-budgeted extractive compression of rant text
+    Features:
+    - Rants within the budget pass through untouched
+    - Longer rants keep their most rant-like sentences, scored in one batch
+      by RantClassifier, in their original order
+    - The opening sentence (the post title) is always kept
+    - Per-call prompt sizes and latencies kept for the stats endpoint
+    """
+
+    def __init__(self, max_tokens: int = 400, classifier: RantClassifier = None, history: int = 50):
+        self.max_tokens = max_tokens
+        self.classifier = classifier or RantClassifier()
+        self._lock = threading.Lock()
+        self._calls = deque(maxlen=history)
+        self.stats = {'rants_shaped': 0, 'rants_compressed': 0, 'tokens_in': 0, 'tokens_out': 0,
+                      'calls': 0, 'prompt_tokens': 0, 'latency_ms': 0.0}
+
+    def _compress(self, sentences: List[str]) -> str:
+        """Keep the highest-scoring sentences that fit the budget."""
+        scores = self.classifier.score_posts(sentences)
+        budget = self.max_tokens - estimate_tokens(sentences[0])
+        keep = {0}
+
+        # Best-scoring first; ties go to the earlier sentence
+        for index in sorted(range(1, len(sentences)), key=lambda i: (-scores[i], i)):
+            cost = estimate_tokens(sentences[index]) + 1
+            if cost <= budget:
+                keep.add(index)
+                budget -= cost
+
+        shaped = ' '.join(sentences[i] for i in sorted(keep))
+        # A single over-long sentence is cut at a word boundary
+        limit = self.max_tokens * CHARS_PER_TOKEN
+        if len(shaped) > limit:
+            shaped = shaped[:limit].rsplit(' ', 1)[0]
+        return shaped
+
+    def shape(self, text: str) -> str:
+        """Return the rant text, compressed if it exceeds the token budget."""
+        tokens = estimate_tokens(text)
+        shaped = text
+        if tokens > self.max_tokens:
+            sentences = split_sentences(text)
+            if sentences:
+                shaped = self._compress(sentences)
+
+        with self._lock:
+            self.stats['rants_shaped'] += 1
+            self.stats['tokens_in'] += tokens
+            self.stats['tokens_out'] += estimate_tokens(shaped)
+            if shaped is not text:
+                self.stats['rants_compressed'] += 1
+        return shaped
+
+    def record_call(self, prompt: str, latency: float, rants: int = 1):
+        """Record the size and latency of one upstream call."""
+        prompt_tokens = estimate_tokens(prompt)
+        with self._lock:
+            self.stats['calls'] += 1
+            self.stats['prompt_tokens'] += prompt_tokens
+            self.stats['latency_ms'] += latency * 1000
+            self._calls.append({'prompt_tokens': prompt_tokens, 'rants': rants,
+                                'latency_ms': round(latency * 1000, 1)})
+
+    def get_stats(self) -> Dict:
+        """Get compression counters and recent per-call input sizes."""
+        with self._lock:
+            stats = dict(self.stats)
+            recent = list(self._calls)
+        calls = stats.pop('calls')
+        stats['max_tokens'] = self.max_tokens
+        stats['tokens_saved'] = stats['tokens_in'] - stats['tokens_out']
+        stats['calls'] = calls
+        stats['avg_prompt_tokens'] = round(stats.pop('prompt_tokens') / calls, 1) if calls else None
+        stats['avg_latency_ms'] = round(stats.pop('latency_ms') / calls, 1) if calls else None
+        stats['recent_calls'] = recent
+        return stats
+
+
+# Global prompt shaper shared by every poem generation call
+_prompt_shaper = None
+_prompt_shaper_lock = threading.Lock()
+
+def get_prompt_shaper() -> PromptShaper:
+    """Get the process-wide prompt shaper"""
+    global _prompt_shaper
+    with _prompt_shaper_lock:
+        if _prompt_shaper is None:
+            _prompt_shaper = PromptShaper(max_tokens=int(os.getenv('PROMPT_MAX_RANT_TOKENS', 400)))
+        return _prompt_shaper
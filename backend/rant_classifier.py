@@ -0,0 +1,85 @@
+"""
+Rant Classifier for Reddit Rant Roulette
+Scores whole listings of posts in one batch for rant-like language
+"""
+from bisect import bisect_right
+from typing import Iterable, List
+
+# Keywords that indicate angry/rant content
+ANGRY_KEYWORDS = [
+    'annoying', 'frustrated', 'pissed', 'angry', 'hate', 'can\'t stand',
+    'sick of', 'tired of', 'furious', 'irritating', 'ridiculous',
+    'stupid', 'idiotic', 'infuriating', 'drives me crazy', 'wtf',
+    'bullshit', 'nonsense', 'unbelievable', 'outrageous'
+]
+
+# Separator used when joining a listing; never matches a keyword
+_SEPARATOR = '\x00'
+
+# Translation table deleting every uppercase BMP character, so caps can be
+# counted with one C-level str.translate instead of a per-character loop
+_DELETE_UPPER = {cp: None for cp in range(0x10000) if chr(cp).isupper()}
+
+
+class RantClassifier:
+    """
+    Batch rant scorer for whole listings
+    Features:
+    - Lowercases and joins a listing once, then searches it per keyword
+    - Skips to the next post as soon as a keyword is found in one
+    - Caps and exclamation counts done with C-level string methods
+    - Returns raw scores so candidates can be ranked, not just filtered
+    """
+
+    def __init__(self, keywords: Iterable[str] = ANGRY_KEYWORDS, keyword_weight: float = 2.0,
+                 caps_weight: float = 10.0, max_exclamations: int = 5, threshold: float = 3.0):
+        self.keywords = [k.lower() for k in keywords]
+        self.keyword_weight = keyword_weight
+        self.caps_weight = caps_weight
+        self.max_exclamations = max_exclamations
+        self.threshold = threshold
+
+    def _style_score(self, text: str) -> float:
+        """Score shouting (caps ratio) and exclamation marks for one text."""
+        if not text:
+            return 0.0
+        caps_ratio = (len(text) - len(text.translate(_DELETE_UPPER))) / len(text)
+        return caps_ratio * self.caps_weight + min(text.count('!'), self.max_exclamations)
+
+    def score(self, text: str) -> float:
+        """Score a single text."""
+        return self.score_posts([text])[0]
+
+    def score_posts(self, texts: List[str]) -> List[float]:
+        """Score every text of a listing at once, returning one score per text."""
+        if not texts:
+            return []
+
+        # Start offset of each lowercased text inside the joined listing
+        lowered = [text.lower() for text in texts]
+        starts = []
+        offset = 0
+        for text in lowered:
+            starts.append(offset)
+            offset += len(text) + len(_SEPARATOR)
+        listing = _SEPARATOR.join(lowered)
+
+        # Count distinct keywords per text; after a hit, resume at the next text
+        matched = [0] * len(texts)
+        for keyword in self.keywords:
+            index = listing.find(keyword)
+            while index != -1:
+                position = bisect_right(starts, index) - 1
+                matched[position] += 1
+                if position + 1 == len(starts):
+                    break
+                index = listing.find(keyword, starts[position + 1])
+
+        return [
+            keyword_count * self.keyword_weight + self._style_score(text)
+            for text, keyword_count in zip(texts, matched)
+        ]
+
+    def is_rant(self, text: str) -> bool:
+        """Check if a single text clears the rant threshold."""
+        return self.score(text) >= self.threshold
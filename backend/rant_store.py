@@ -0,0 +1,271 @@
+"""
+Rant Store for Reddit Rant Roulette
+Persistent local SQLite corpus of filtered rants with full-text search,
+plus a memory-mapped JSONL corpus for offline mode and benchmarks
+Keeps Reddit latency and quota off the request path
+"""
+import json
+import mmap
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional
+import logging
+
+from sampling import AliasTable
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CORPUS_PATH = 'rant_corpus.db'
+
+_RANT_COLUMNS = ('post_id', 'title', 'content', 'subreddit', 'score', 'rant_score', 'url')
+
+
+class RantStore:
+    """
+    SQLite-backed rant corpus
+    Features:
+    - Deduplicates posts by Reddit ID
+    - FTS5 index over title and content (when SQLite supports it)
+    - Random sampling by rowid lookup instead of ORDER BY RANDOM()
+    - Safe to share between request threads and the background ingester
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or os.getenv('RANT_CORPUS_DB', DEFAULT_CORPUS_PATH)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self.fts_enabled = False
+        self._init_schema()
+
+        # Rowid bounds for constant-time sampling, kept current on insert
+        self._min_id, self._max_id = self._conn.execute(
+            "SELECT COALESCE(MIN(id), 0), COALESCE(MAX(id), 0) FROM rants"
+        ).fetchone()
+
+    def _init_schema(self):
+        """Create tables, the FTS index and its sync triggers if missing."""
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS rants (
+                    id INTEGER PRIMARY KEY,
+                    post_id TEXT UNIQUE,
+                    title TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    subreddit TEXT,
+                    score INTEGER,
+                    rant_score REAL,
+                    url TEXT,
+                    ingested_at REAL
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS ingest_cursors (
+                    subreddit TEXT PRIMARY KEY,
+                    before TEXT,
+                    updated_at REAL
+                )
+            """)
+            try:
+                self._conn.execute("""
+                    CREATE VIRTUAL TABLE IF NOT EXISTS rants_fts
+                    USING fts5(title, content, content='rants', content_rowid='id')
+                """)
+                self._conn.execute("""
+                    CREATE TRIGGER IF NOT EXISTS rants_fts_insert AFTER INSERT ON rants BEGIN
+                        INSERT INTO rants_fts(rowid, title, content)
+                        VALUES (new.id, new.title, new.content);
+                    END
+                """)
+                self._conn.execute("""
+                    CREATE TRIGGER IF NOT EXISTS rants_fts_delete AFTER DELETE ON rants BEGIN
+                        INSERT INTO rants_fts(rants_fts, rowid, title, content)
+                        VALUES ('delete', old.id, old.title, old.content);
+                    END
+                """)
+                self.fts_enabled = True
+            except sqlite3.OperationalError as e:
+                logger.warning(f"⚠️ SQLite FTS5 unavailable, search disabled: {e}")
+
+    def _row_to_rant(self, row) -> Dict:
+        """Convert a database row back into our rant dictionary."""
+        return {
+            'id': row['post_id'],
+            'title': row['title'],
+            'content': row['content'],
+            'subreddit': row['subreddit'],
+            'score': row['score'],
+            'rant_score': row['rant_score'],
+            'url': row['url']
+        }
+
+    def add_rants(self, rants: List[Dict]) -> int:
+        """Insert rants, skipping ones already stored. Returns how many were new."""
+        now = time.time()
+        rows = [
+            (rant.get('id') or rant['url'], rant['title'], rant['content'], rant.get('subreddit'),
+             rant.get('score', 0), rant.get('rant_score'), rant.get('url'), now)
+            for rant in rants
+        ]
+        with self._lock, self._conn:
+            cursor = self._conn.executemany(
+                f"INSERT OR IGNORE INTO rants ({', '.join(_RANT_COLUMNS)}, ingested_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            added = max(cursor.rowcount, 0)
+            self._min_id, self._max_id = self._conn.execute(
+                "SELECT COALESCE(MIN(id), 0), COALESCE(MAX(id), 0) FROM rants"
+            ).fetchone()
+        return added
+
+    def count(self) -> int:
+        """Number of rants in the corpus."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM rants").fetchone()[0]
+
+    def random_rant(self) -> Optional[Dict]:
+        """Sample a rant with a single primary-key lookup."""
+        with self._lock:
+            if not self._max_id:
+                return None
+            # Pick a rowid and take the first row at or after it (ids are near-dense)
+            target = random.randint(self._min_id, self._max_id)
+            row = self._conn.execute(
+                "SELECT * FROM rants WHERE id >= ? ORDER BY id LIMIT 1", (target,)
+            ).fetchone()
+        return self._row_to_rant(row) if row else None
+
+    def random_rants(self, count: int) -> List[Dict]:
+        """Sample up to count distinct rants."""
+        rants = {}
+        for _ in range(count * 3):
+            if len(rants) >= count:
+                break
+            rant = self.random_rant()
+            if rant is None:
+                break
+            rants[rant['id']] = rant
+        return list(rants.values())
+
+    def search(self, query: str, limit: int = 10) -> List[Dict]:
+        """Full-text search over title and content."""
+        if not self.fts_enabled:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT rants.* FROM rants_fts JOIN rants ON rants.id = rants_fts.rowid "
+                "WHERE rants_fts MATCH ? ORDER BY rank LIMIT ?",
+                (query, limit)
+            ).fetchall()
+        return [self._row_to_rant(row) for row in rows]
+
+    def get_cursor(self, subreddit: str) -> Optional[Dict]:
+        """Get the stored listing cursor for a subreddit, if any."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT before, updated_at FROM ingest_cursors WHERE subreddit = ?", (subreddit,)
+            ).fetchone()
+        return {'before': row['before'], 'updated_at': row['updated_at']} if row else None
+
+    def set_cursor(self, subreddit: str, before: Optional[str]):
+        """Persist the newest seen post fullname for a subreddit."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ingest_cursors (subreddit, before, updated_at) VALUES (?, ?, ?)",
+                (subreddit, before, time.time())
+            )
+
+    def export_jsonl(self, path: str) -> int:
+        """Write the corpus out as JSONL (one rant per line) for offline use."""
+        written = 0
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM rants ORDER BY id").fetchall()
+        with open(path, 'w', encoding='utf-8') as f:
+            for row in rows:
+                f.write(json.dumps(self._row_to_rant(row), ensure_ascii=False) + '\n')
+                written += 1
+        return written
+
+    def close(self):
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+class JsonlRantCorpus:
+    """
+    Read-only JSONL rant corpus accessed through a memory map
+    Features:
+    - Builds only a compact line-offset index; rants are parsed on demand
+    - O(1) uniform draws by line number
+    - O(1) weighted draws through an alias table over a numeric field
+      (read with a regex per line, not a full JSON parse)
+    """
+
+    def __init__(self, path: str, weight_field: str = 'score'):
+        self.path = path
+        self.weight_field = weight_field
+        self._offsets = array('Q')
+        self._mm = None
+
+        weights = array('d')
+        weight_pattern = re.compile(rb'"' + re.escape(weight_field.encode()) + rb'"\s*:\s*(-?\d+(?:\.\d+)?)')
+
+        self._file = open(path, 'rb')
+        if os.fstat(self._file.fileno()).st_size:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            size = len(self._mm)
+            pos = 0
+            while pos < size:
+                end = self._mm.find(b'\n', pos)
+                if end == -1:
+                    end = size
+                line = self._mm[pos:end]
+                if line.strip():
+                    self._offsets.append(pos)
+                    match = weight_pattern.search(line)
+                    # Every rant stays drawable; engagement adds weight on top
+                    weights.append(1.0 + max(float(match.group(1)), 0.0) if match else 1.0)
+                pos = end + 1
+
+        self._alias = AliasTable(weights)
+        logger.info(f"📚 Indexed {len(self._offsets)} rants from {path}")
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def get(self, index: int) -> Dict:
+        """Parse the rant on a given line of the index."""
+        start = self._offsets[index]
+        end = self._mm.find(b'\n', start)
+        return json.loads(self._mm[start:end if end != -1 else len(self._mm)])
+
+    def random_rant(self) -> Optional[Dict]:
+        """Uniformly sample one rant."""
+        if not self._offsets:
+            return None
+        return self.get(random.randrange(len(self._offsets)))
+
+    def weighted_rant(self) -> Optional[Dict]:
+        """Sample one rant in proportion to its weight field."""
+        if not self._offsets:
+            return None
+        return self.get(self._alias.sample())
+
+    def random_rants(self, count: int) -> List[Dict]:
+        """Sample up to count distinct rants."""
+        indices = random.sample(range(len(self._offsets)), min(count, len(self._offsets)))
+        return [self.get(i) for i in indices]
+
+    def close(self):
+        """Release the memory map and file handle."""
+        if self._mm is not None:
+            self._mm.close()
+        self._file.close()
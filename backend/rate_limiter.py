@@ -0,0 +1,253 @@
+"""
+Rate Limiting for Reddit Rant Roulette
+Central admission control for upstream API calls (Reddit and Gemini) so
+the background worker and the request handlers share one budget instead
+of racing each other into throttling errors
+"""
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a call cannot be admitted within the caller's wait budget."""
+
+    def __init__(self, wait: float, message: str = None):
+        self.wait = wait
+        super().__init__(message or f"Rate limited; next slot in {wait:.1f}s")
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket
+    Tokens refill continuously at `rate` per second up to `capacity`.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, cost: float = 1) -> float:
+        """Seconds until `cost` tokens are available (0 if available now)."""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self.tokens >= cost:
+                return 0.0
+            return (cost - self.tokens) / self.rate if self.rate > 0 else float('inf')
+
+    def try_take(self, cost: float = 1) -> float:
+        """Take `cost` tokens if available. Returns 0 on success, else the wait estimate."""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self.tokens >= cost:
+                self.tokens -= cost
+                return 0.0
+            return (cost - self.tokens) / self.rate if self.rate > 0 else float('inf')
+
+    def configure(self, rate: float = None, capacity: float = None, tokens: float = None):
+        """Resize the bucket in place, e.g. from upstream quota headers."""
+        with self._lock:
+            self._refill(time.monotonic())
+            if rate is not None:
+                self.rate = rate
+            if capacity is not None:
+                self.capacity = capacity
+            if tokens is not None:
+                self.tokens = tokens
+            self.tokens = min(self.tokens, self.capacity)
+
+
+class RateScheduler:
+    """
+    Token-bucket admission control shared by every caller of one upstream API
+    Features:
+    - Callers get either a wait estimate or a fast RateLimitExceeded
+    - Holds all calls until a deadline after an upstream 429
+    """
+
+    default_backoff = 60
+
+    def __init__(self, rate: float, capacity: float):
+        self._bucket = TokenBucket(rate=rate, capacity=capacity)
+        self._lock = threading.Lock()
+        self._blocked_until = 0.0
+        self.stats = {'admitted': 0, 'rejected': 0, 'waited_seconds': 0.0, 'throttled': 0}
+
+    def wait_estimate(self, cost: float = 1) -> float:
+        """Seconds until a call of this cost would be admitted."""
+        self._roll_window()
+        blocked = max(0.0, self._blocked_until - time.time())
+        return max(blocked, self._bucket.wait_time(cost))
+
+    def acquire(self, cost: float = 1, max_wait: float = 0) -> float:
+        """
+        Admit a call, waiting up to max_wait seconds for a slot.
+        Returns the time waited; raises RateLimitExceeded instead of waiting longer.
+        """
+        waited = 0.0
+        while True:
+            self._roll_window()
+            blocked = max(0.0, self._blocked_until - time.time())
+            wait = blocked or self._bucket.try_take(cost)
+            if wait == 0:
+                with self._lock:
+                    self.stats['admitted'] += 1
+                    self.stats['waited_seconds'] += waited
+                return waited
+            if waited + wait > max_wait:
+                with self._lock:
+                    self.stats['rejected'] += 1
+                raise RateLimitExceeded(wait)
+            time.sleep(wait)
+            waited += wait
+
+    def _roll_window(self):
+        """Hook for schedulers whose quota resets on a fixed window."""
+
+    def throttled(self, retry_after: float = None):
+        """Record an upstream 429 and hold all calls until the retry window passes."""
+        with self._lock:
+            self.stats['throttled'] += 1
+            self._blocked_until = max(self._blocked_until, time.time() + (retry_after or self.default_backoff))
+
+    def get_stats(self) -> Dict:
+        """Get admission counters and the current bucket state."""
+        with self._lock:
+            stats = dict(self.stats)
+        stats['tokens'] = round(self._bucket.tokens, 2)
+        stats['rate_per_second'] = round(self._bucket.rate, 3)
+        stats['next_slot_in'] = round(self.wait_estimate(), 2)
+        return stats
+
+
+class RedditRateScheduler(RateScheduler):
+    """
+    Token-bucket scheduler for Reddit API calls
+    Features:
+    - Sized from Reddit's X-Ratelimit-Remaining / X-Ratelimit-Reset headers
+    - Keeps a reserve so the quota is never driven to zero
+    - Callers get either a wait estimate or a fast RateLimitExceeded
+    - Backs off until the reset window after a 429
+    - Falls back to the default rate once the advertised window resets
+    """
+
+    def __init__(self, requests_per_minute: float = 100, reserve: int = 5):
+        super().__init__(rate=requests_per_minute / 60, capacity=requests_per_minute / 6)
+        self.reserve = reserve
+        self._default_rate = requests_per_minute / 60
+        self._default_capacity = requests_per_minute / 6
+        self._reset_at = None
+        self.stats.update({'remaining': None, 'reset_in': None})
+
+    def update_from_limits(self, limits: Optional[Dict]):
+        """
+        Resize the bucket from the latest rate-limit headers.
+        limits: PRAW's reddit.auth.limits ({'remaining', 'reset_timestamp', 'used'})
+        """
+        if not limits or limits.get('remaining') is None or not limits.get('reset_timestamp'):
+            return
+        remaining = max(0.0, float(limits['remaining']) - self.reserve)
+        reset_in = max(1.0, limits['reset_timestamp'] - time.time())
+
+        # Spread what is left evenly over the rest of the window
+        rate = remaining / reset_in
+        self._bucket.configure(rate=rate, capacity=max(1.0, min(remaining, rate * 10)),
+                               tokens=min(self._bucket.tokens, remaining))
+        with self._lock:
+            self.stats['remaining'] = limits['remaining']
+            self.stats['reset_in'] = round(reset_in, 1)
+            self._reset_at = limits['reset_timestamp']
+            if remaining <= 0:
+                self._blocked_until = max(self._blocked_until, limits['reset_timestamp'])
+
+    def _roll_window(self):
+        """Restore the default budget once the advertised window has reset."""
+        with self._lock:
+            if self._reset_at is None or time.time() < self._reset_at:
+                return
+            self._reset_at = None
+        # The next response's headers resize the bucket again
+        self._bucket.configure(rate=self._default_rate, capacity=self._default_capacity,
+                               tokens=self._default_capacity)
+
+
+class AdaptiveRateLimiter(RateScheduler):
+    """
+    AIMD rate limiter for an API whose quota is not advertised (Gemini)
+    Features:
+    - Additive increase: every success raises the rate a little
+    - Multiplicative decrease: every 429 cuts the rate and pauses all callers
+    - Honors retry-after hints from the upstream, else backs off by one interval
+    - Rate kept within [min, max] requests per minute
+    """
+
+    def __init__(self, requests_per_minute: float = 10, min_per_minute: float = 1,
+                 max_per_minute: float = 60, increase_per_minute: float = 0.5,
+                 decrease_factor: float = 0.5, burst: float = 2):
+        super().__init__(rate=requests_per_minute / 60, capacity=burst)
+        self.min_rate = min_per_minute / 60
+        self.max_rate = max_per_minute / 60
+        self.increase = increase_per_minute / 60
+        self.decrease_factor = decrease_factor
+        self.stats.update({'successes': 0, 'increases': 0, 'decreases': 0})
+
+    def record_success(self):
+        """Probe for headroom after a call the upstream accepted."""
+        with self._lock:
+            self.stats['successes'] += 1
+            rate = min(self.max_rate, self._bucket.rate + self.increase)
+            if rate > self._bucket.rate:
+                self.stats['increases'] += 1
+        self._bucket.configure(rate=rate)
+
+    def throttled(self, retry_after: float = None):
+        """Record a 429: cut the rate and hold callers for the retry window."""
+        with self._lock:
+            rate = max(self.min_rate, self._bucket.rate * self.decrease_factor)
+            self.stats['decreases'] += 1
+        self._bucket.configure(rate=rate, tokens=0)
+        super().throttled(retry_after or 1 / rate)
+
+    def get_stats(self) -> Dict:
+        """Get admission counters and the learned rate."""
+        stats = super().get_stats()
+        stats['rate_per_minute'] = round(self._bucket.rate * 60, 2)
+        return stats
+
+
+# Global Reddit scheduler shared by every Reddit caller in the process
+_reddit_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def get_reddit_scheduler() -> RedditRateScheduler:
+    """Get the process-wide Reddit rate scheduler"""
+    global _reddit_scheduler
+    with _scheduler_lock:
+        if _reddit_scheduler is None:
+            _reddit_scheduler = RedditRateScheduler(
+                requests_per_minute=float(os.getenv('REDDIT_REQUESTS_PER_MINUTE', 100))
+            )
+        return _reddit_scheduler
+
+
+# Global Gemini limiter shared by the API handlers and the cache worker
+_gemini_limiter = None
+
+def get_gemini_limiter() -> AdaptiveRateLimiter:
+    """Get the process-wide adaptive Gemini rate limiter"""
+    global _gemini_limiter
+    with _scheduler_lock:
+        if _gemini_limiter is None:
+            _gemini_limiter = AdaptiveRateLimiter(
+                requests_per_minute=float(os.getenv('GEMINI_REQUESTS_PER_MINUTE', 10)),
+                max_per_minute=float(os.getenv('GEMINI_MAX_REQUESTS_PER_MINUTE', 60))
+            )
+        return _gemini_limiter
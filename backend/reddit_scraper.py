@@ -1,21 +1,74 @@
 import praw
+import prawcore
+import requests
+from requests.adapters import HTTPAdapter
 import random
 import os
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from dotenv import load_dotenv
-from typing import List, Dict
+from typing import List, Dict, Optional
 import re
 
+from rant_classifier import RantClassifier, ANGRY_KEYWORDS
+from rant_store import RantStore, JsonlRantCorpus
+from sampling import WeightedCandidatePool
+from dedup import SeenPostIndex, NearDuplicateIndex, get_seen_index, get_near_duplicate_index
+from rate_limiter import RedditRateScheduler, RateLimitExceeded, get_reddit_scheduler
+
 # Load environment variables
 load_dotenv()
 
+def create_reddit_client(pool_size: int = None) -> praw.Reddit:
+    """
+    Create a PRAW client whose HTTP session keeps a pool of keep-alive connections.
+    pool_size: connections kept per host (defaults to REDDIT_POOL_SIZE or 10)
+    """
+    pool_size = pool_size or int(os.getenv('REDDIT_POOL_SIZE', 10))
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    
+    return praw.Reddit(
+        client_id=os.getenv('REDDIT_CLIENT_ID'),
+        client_secret=os.getenv('REDDIT_CLIENT_SECRET'),
+        user_agent=os.getenv('REDDIT_USER_AGENT', 'RedditRantRoulette/1.0'),
+        requestor_kwargs={'session': session}
+    )
+
 class RedditRantScraper:
-    def __init__(self):
-        """Initialize the Reddit scraper with API credentials."""
-        self.reddit = praw.Reddit(
-            client_id=os.getenv('REDDIT_CLIENT_ID'),
-            client_secret=os.getenv('REDDIT_CLIENT_SECRET'),
-            user_agent=os.getenv('REDDIT_USER_AGENT', 'RedditRantRoulette/1.0')
-        )
+    using_live_data = True
+    
+    def __init__(self, reddit: praw.Reddit = None, listing_ttl: int = 300, refresh_threshold: int = 5, max_workers: int = 5,
+                 seen_index: SeenPostIndex = None, near_duplicates: NearDuplicateIndex = None,
+                 target_candidates: int = 20, min_limit: int = 25, max_limit: int = 100,
+                 exploration: float = 0.05, scheduler: RedditRateScheduler = None,
+                 request_max_wait: float = 1.0, background_max_wait: float = 30.0,
+                 min_refresh_interval: float = 60.0):
+        """
+        Initialize the Reddit scraper with API credentials.
+        reddit: PRAW client to use; defaults to a new pooled client
+        listing_ttl: seconds a fetched subreddit listing stays servable
+        refresh_threshold: remaining candidates that trigger a background refresh
+        min_refresh_interval: seconds a listing must age before running low can refresh
+        it; doubled (up to the near-expiry refresh) while refreshes find nothing new
+        max_workers: size of the pool used for concurrent multi-rant fetches
+        seen_index: posts already turned into poems; defaults to the shared index
+        near_duplicates: fingerprints of rants with poems; with NEAR_DUPLICATE_MODE=drop
+        reworded reposts of them are filtered out of listings
+        target_candidates: rant candidates each listing fetch should aim to yield
+        min_limit / max_limit: bounds for the adaptive per-subreddit listing size
+        exploration: minimum share of the top subreddit's weight every subreddit keeps
+        scheduler: admission control for Reddit calls; defaults to the shared scheduler
+        request_max_wait / background_max_wait: seconds a foreground or background
+        fetch may wait for a rate-limit slot before being rejected
+        """
+        self.reddit = reddit or create_reddit_client()
+        self.scheduler = scheduler or get_reddit_scheduler()
+        self.request_max_wait = request_max_wait
+        self.background_max_wait = background_max_wait
         
         # Subreddits known for rants and angry posts
         self.rant_subreddits = [
@@ -32,33 +85,45 @@ class RedditRantScraper:
         ]
         
         # Keywords that indicate angry/rant content
-        self.angry_keywords = [
-            'annoying', 'frustrated', 'pissed', 'angry', 'hate', 'can\'t stand',
-            'sick of', 'tired of', 'furious', 'irritating', 'ridiculous',
-            'stupid', 'idiotic', 'infuriating', 'drives me crazy', 'wtf',
-            'bullshit', 'nonsense', 'unbelievable', 'outrageous'
-        ]
-    
-    def is_rant_like(self, text: str) -> bool:
-        """Check if the text contains rant-like language."""
-        text_lower = text.lower()
-        
-        # Check for angry keywords
-        angry_count = sum(1 for keyword in self.angry_keywords if keyword in text_lower)
+        self.angry_keywords = list(ANGRY_KEYWORDS)
+        self.classifier = RantClassifier(self.angry_keywords)
         
-        # Check for excessive capitalization (shouting)
-        caps_ratio = sum(1 for c in text if c.isupper()) / len(text) if text else 0
+        # Posts already used by the cache are skipped when handing out candidates
+        self.seen_index = seen_index or get_seen_index()
+        self.near_duplicates = near_duplicates or get_near_duplicate_index()
+        self.drop_near_duplicates = os.getenv('NEAR_DUPLICATE_MODE', 'map') == 'drop'
         
-        # Check for excessive punctuation
-        exclamation_count = text.count('!')
+        # Per-subreddit listing cache so one hot() fetch serves many rants
+        self.listing_ttl = listing_ttl
+        self.refresh_threshold = refresh_threshold
+        self.min_refresh_interval = min_refresh_interval
+        self._listing_lock = threading.RLock()
+        self._listings = {}  # subreddit -> {'candidates', 'fallbacks', 'fetched_at', 'refresh_interval'}
+        self._refreshing = set()  # Subreddits with a background refresh in flight
+        self._fetch_locks = {}  # subreddit -> lock so concurrent callers share one fetch
         
-        # Scoring system
-        score = 0
-        score += angry_count * 2  # Angry keywords are worth 2 points each
-        score += caps_ratio * 10  # High caps ratio adds points
-        score += min(exclamation_count, 5)  # Max 5 points for exclamations
+        # Per-subreddit yield and latency, used to weight sampling and size listings
+        self.target_candidates = target_candidates
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.exploration = exploration
+        self._stats_lock = threading.Lock()
+        self._subreddit_stats = {
+            name: {'fetches': 0, 'errors': 0, 'posts': 0, 'rants': 0, 'fallback_serves': 0,
+                   'yield_ewma': None, 'latency_ewma': None, 'rants_per_second_ewma': None}
+            for name in self.rant_subreddits
+        }
         
-        return score >= 3  # Threshold for considering it a rant
+        # Bounded worker pool for fanning out across subreddits
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='rant-fetch')
+    
+    def is_rant_like(self, text: str) -> bool:
+        """Check if the text contains rant-like language."""
+        return self.classifier.is_rant(text)
+    
+    def score_posts(self, posts) -> List[float]:
+        """Score a whole listing of PRAW submissions for rant-like language."""
+        return self.classifier.score_posts([f"{post.title} {post.selftext}" for post in posts])
     
     def clean_text(self, text: str) -> str:
         """Clean and format the text for better readability."""
@@ -73,70 +138,366 @@ class RedditRantScraper:
         
         return text.strip()
     
-    def get_random_rant(self, limit: int = 50) -> Dict[str, str]:
-        """Get a random rant from Reddit."""
+    def _to_rant(self, post, subreddit_name: str, rant_score: float) -> Dict[str, str]:
+        """Convert a PRAW submission into our rant dictionary."""
+        return {
+            'id': post.id,
+            'title': post.title,
+            'content': self.clean_text(post.selftext),
+            'subreddit': subreddit_name,
+            'score': post.score,
+            'rant_score': round(rant_score, 2),
+            'url': f"https://reddit.com{post.permalink}"
+        }
+    
+    def filter_posts(self, posts, subreddit_name: str):
+        """Split a listing into rant candidates and plain text-post fallbacks."""
+        # Ensure there's substantial text, then score the whole listing in one pass
+        text_posts = [p for p in posts if p.selftext and len(p.selftext) > 100]
+        scores = self.score_posts(text_posts)
+        
+        # Filter for rant-like posts, keeping any substantial text post as a fallback
+        candidates = []
+        fallbacks = []
+        for post, rant_score in zip(text_posts, scores):
+            rant = self._to_rant(post, subreddit_name, rant_score)
+            if rant_score >= self.classifier.threshold:
+                if self.drop_near_duplicates and self.near_duplicates.find(self.near_duplicates.text_for(rant)):
+                    continue
+                candidates.append(rant)
+            else:
+                fallbacks.append(rant)
+        return candidates, fallbacks
+    
+    def _call_reddit(self, fetch, limit: int, max_wait: float) -> list:
+        """
+        Run a listing fetch through the shared rate scheduler.
+        Raises RateLimitExceeded without calling Reddit if no slot opens within max_wait.
+        """
+        cost = max(1, math.ceil(limit / 100))  # Reddit serves at most 100 posts per request
+        self.scheduler.acquire(cost, max_wait=max_wait)
         try:
-            # Randomly select a subreddit
-            subreddit_name = random.choice(self.rant_subreddits)
-            subreddit = self.reddit.subreddit(subreddit_name)
-            
-            # Get hot posts from the subreddit
-            posts = list(subreddit.hot(limit=limit))
-            
-            # Filter for rant-like posts
-            rant_posts = []
-            for post in posts:
-                if post.selftext and len(post.selftext) > 100:  # Ensure there's substantial text
-                    full_text = f"{post.title} {post.selftext}"
-                    if self.is_rant_like(full_text):
-                        rant_posts.append({
-                            'title': post.title,
-                            'content': post.selftext,
-                            'subreddit': subreddit_name,
-                            'score': post.score,
-                            'url': f"https://reddit.com{post.permalink}"
-                        })
+            return list(fetch())
+        except prawcore.exceptions.TooManyRequests as e:
+            self.scheduler.throttled(float(e.retry_after) if e.retry_after else None)
+            raise
+        finally:
+            try:
+                self.scheduler.update_from_limits(self.reddit.auth.limits)
+            except Exception:
+                pass
+    
+    def fetch_posts(self, subreddit_name: str, limit: int = 50, listing: str = 'hot',
+                    before: Optional[str] = None, max_wait: Optional[float] = None) -> list:
+        """
+        Fetch raw submissions from a subreddit listing.
+        listing: 'hot' or 'new'
+        before: only return posts newer than this fullname (for 'new' listings)
+        max_wait: seconds to wait for a rate-limit slot (defaults to the background budget)
+        """
+        subreddit = self.reddit.subreddit(subreddit_name)
+        max_wait = self.background_max_wait if max_wait is None else max_wait
+        if listing == 'new':
+            params = {'before': before} if before else None
+            return self._call_reddit(lambda: subreddit.new(limit=limit, params=params), limit, max_wait)
+        return self._call_reddit(lambda: subreddit.hot(limit=limit), limit, max_wait)
+    
+    @staticmethod
+    def candidate_weight(rant: Dict) -> float:
+        """Sampling weight of a candidate: rant score scaled by log engagement."""
+        return rant.get('rant_score', 1.0) * (1.0 + math.log1p(max(rant.get('score', 0), 0)))
+    
+    def _record_fetch(self, subreddit_name: str, posts: int, rants: int, latency: float,
+                      error: bool = False, alpha: float = 0.3):
+        """Fold one listing fetch into the subreddit's EWMA yield and latency."""
+        with self._stats_lock:
+            stats = self._subreddit_stats.setdefault(subreddit_name, {
+                'fetches': 0, 'errors': 0, 'posts': 0, 'rants': 0, 'fallback_serves': 0,
+                'yield_ewma': None, 'latency_ewma': None, 'rants_per_second_ewma': None
+            })
+            stats['fetches'] += 1
+            if error:
+                # A failed fetch counts as a slow fetch that yielded nothing
+                stats['errors'] += 1
+                posts, rants = 0, 0
             
-            if rant_posts:
-                # Return a random rant from the filtered list
-                selected_rant = random.choice(rant_posts)
-                selected_rant['content'] = self.clean_text(selected_rant['content'])
-                return selected_rant
+            stats['posts'] += posts
+            stats['rants'] += rants
+            observations = {
+                'latency_ewma': latency,
+                'rants_per_second_ewma': rants / max(latency, 0.001)
+            }
+            if posts:
+                observations['yield_ewma'] = rants / posts
+            for key, value in observations.items():
+                previous = stats[key]
+                stats[key] = value if previous is None else alpha * value + (1 - alpha) * previous
+    
+    def adaptive_limit(self, subreddit_name: str) -> int:
+        """Listing size expected to yield target_candidates rants from this subreddit."""
+        with self._stats_lock:
+            yield_rate = self._subreddit_stats.get(subreddit_name, {}).get('yield_ewma')
+        if not yield_rate:
+            return self.max_limit if yield_rate == 0 else 50
+        limit = math.ceil(self.target_candidates / yield_rate)
+        return max(self.min_limit, min(self.max_limit, limit))
+    
+    def _sampling_weights(self) -> Dict[str, float]:
+        """Weight each subreddit by its expected rants per second of fetching."""
+        with self._stats_lock:
+            rates = {name: self._subreddit_stats.get(name, {}).get('rants_per_second_ewma')
+                     for name in self.rant_subreddits}
+        
+        known = [rate for rate in rates.values() if rate is not None]
+        top = max(known) if known and max(known) > 0 else 1.0
+        
+        # Unmeasured subreddits are tried optimistically; every subreddit keeps a floor
+        return {
+            name: max(top if rate is None else rate, top * self.exploration)
+            for name, rate in rates.items()
+        }
+    
+    def _choose_subreddit(self) -> str:
+        """Pick a subreddit in proportion to its expected rants per second."""
+        weights = self._sampling_weights()
+        return random.choices(list(weights), weights=list(weights.values()))[0]
+    
+    def _fetch_listing(self, subreddit_name: str, limit: int, max_wait: Optional[float] = None) -> Dict:
+        """Fetch a hot listing once and keep every rant candidate from it."""
+        subreddit = self.reddit.subreddit(subreddit_name)
+        max_wait = self.request_max_wait if max_wait is None else max_wait
+        
+        # Get hot posts from the subreddit, timing the round trip
+        started = time.time()
+        try:
+            posts = self._call_reddit(lambda: subreddit.hot(limit=limit), limit, max_wait)
+        except RateLimitExceeded:
+            raise
+        except Exception:
+            self._record_fetch(subreddit_name, 0, 0, time.time() - started, error=True)
+            raise
+        latency = time.time() - started
+        candidates, fallbacks = self.filter_posts(posts, subreddit_name)
+        self._record_fetch(subreddit_name, len(posts), len(candidates), latency)
+        
+        # Only unseen posts count, so the low-water mark reflects what can still be served
+        candidates = [rant for rant in candidates if not self.seen_index.seen(rant)]
+        
+        # A listing with nothing new backs off before running low can refetch it
+        with self._listing_lock:
+            previous = self._listings.get(subreddit_name)
+            if candidates or previous is None:
+                refresh_interval = self.min_refresh_interval
             else:
-                # Fallback: return any post with substantial text
-                text_posts = [p for p in posts if p.selftext and len(p.selftext) > 100]
-                if text_posts:
-                    fallback_post = random.choice(text_posts)
-                    return {
-                        'title': fallback_post.title,
-                        'content': self.clean_text(fallback_post.selftext),
-                        'subreddit': subreddit_name,
-                        'score': fallback_post.score,
-                        'url': f"https://reddit.com{fallback_post.permalink}"
-                    }
-                
+                refresh_interval = min(previous['refresh_interval'] * 2, self.listing_ttl * 0.75)
+        
+        # Weighted pool hands candidates out without repeats, favoring strong rants
+        listing = {
+            'candidates': WeightedCandidatePool(candidates, self.candidate_weight),
+            'fallbacks': fallbacks,
+            'fetched_at': time.time(),
+            'refresh_interval': refresh_interval
+        }
+        with self._listing_lock:
+            self._listings[subreddit_name] = listing
+        return listing
+    
+    def _refresh_listing_async(self, subreddit_name: str, limit: int):
+        """Refresh a subreddit listing in the background if not already refreshing."""
+        with self._listing_lock:
+            if subreddit_name in self._refreshing:
+                return
+            self._refreshing.add(subreddit_name)
+        
+        def refresh():
+            try:
+                self._fetch_listing(subreddit_name, limit, max_wait=self.background_max_wait)
+            except Exception as e:
+                print(f"Error refreshing listing for subreddit {subreddit_name}: {e}")
+            finally:
+                with self._listing_lock:
+                    self._refreshing.discard(subreddit_name)
+        
+        threading.Thread(target=refresh, daemon=True).start()
+    
+    def _take_from_listing(self, subreddit_name: str, limit: Optional[int] = None) -> Optional[Dict[str, str]]:
+        """Serve the next unseen rant from a cached listing, fetching it if needed."""
+        limit = limit or self.adaptive_limit(subreddit_name)
+        
+        with self._listing_lock:
+            fetch_lock = self._fetch_locks.setdefault(subreddit_name, threading.Lock())
+        
+        # Expired or missing listings are fetched in the foreground, once per subreddit
+        with fetch_lock:
+            with self._listing_lock:
+                listing = self._listings.get(subreddit_name)
+                age = time.time() - listing['fetched_at'] if listing else None
+            
+            if listing is None or age > self.listing_ttl:
+                listing = self._fetch_listing(subreddit_name, limit)
+                age = 0
+        
+        with self._listing_lock:
+            rant = None
+            while listing['candidates']:
+                candidate = listing['candidates'].draw()
+                if not self.seen_index.seen(candidate):
+                    rant = candidate
+                    break
+            remaining = len(listing['candidates'])
+        
+        # Refresh ahead of time when running low or close to expiry; running low
+        # refreshes at most once per refresh interval
+        running_low = remaining < self.refresh_threshold and age >= listing['refresh_interval']
+        if running_low or age > self.listing_ttl * 0.75:
+            self._refresh_listing_async(subreddit_name, limit)
+        
+        if rant:
+            return dict(rant)
+        
+        # Fallback: return a post with substantial text, preferring ones not yet used
+        if listing['fallbacks']:
+            with self._stats_lock:
+                self._subreddit_stats[subreddit_name]['fallback_serves'] += 1
+            fallbacks = random.sample(listing['fallbacks'], len(listing['fallbacks']))
+            unseen = next((post for post in fallbacks if not self.seen_index.seen(post)), None)
+            return dict(unseen or fallbacks[0])
+        return None
+    
+    def get_random_rant(self, limit: Optional[int] = None) -> Dict[str, str]:
+        """
+        Get a random rant from Reddit, served from the per-subreddit listing cache.
+        limit: listing size; defaults to the subreddit's adaptive limit
+        """
+        try:
+            # Select a subreddit weighted by its measured rant yield
+            subreddit_name = self._choose_subreddit()
+            return self._take_from_listing(subreddit_name, limit)
+        
+        except RateLimitExceeded as e:
+            print(f"Skipping r/{subreddit_name}: {e}")
+            return None
         except Exception as e:
             print(f"Error fetching from subreddit {subreddit_name}: {e}")
             return None
     
-    def get_multiple_rants(self, count: int = 5) -> List[Dict[str, str]]:
-        """Get multiple rants for variety."""
+    def get_listing_stats(self) -> Dict[str, Dict]:
+        """Report cached candidates and age for each subreddit listing."""
+        now = time.time()
+        with self._listing_lock:
+            return {
+                name: {
+                    'candidates': len(listing['candidates']),
+                    'fallbacks': len(listing['fallbacks']),
+                    'age_seconds': round(now - listing['fetched_at'], 1),
+                    'refreshing': name in self._refreshing
+                }
+                for name, listing in self._listings.items()
+            }
+    
+    def get_subreddit_stats(self) -> Dict[str, Dict]:
+        """Report fetch yield, latency, adaptive limit and sampling share per subreddit."""
+        weights = self._sampling_weights()
+        with self._stats_lock:
+            stats = {name: dict(values) for name, values in self._subreddit_stats.items()}
+        total_weight = sum(weights.values()) or 1.0
+        
+        for name, values in stats.items():
+            for key in ('yield_ewma', 'latency_ewma', 'rants_per_second_ewma'):
+                if values[key] is not None:
+                    values[key] = round(values[key], 3)
+            values['limit'] = self.adaptive_limit(name)
+            values['sampling_share'] = round(weights.get(name, 0) / total_weight, 3)
+        return stats
+    
+    def _get_rant_from(self, subreddit_name: str, limit: Optional[int] = None) -> Optional[Dict[str, str]]:
+        """Get a rant from a specific subreddit, returning None on errors."""
+        try:
+            return self._take_from_listing(subreddit_name, limit)
+        except RateLimitExceeded as e:
+            print(f"Skipping r/{subreddit_name}: {e}")
+            return None
+        except Exception as e:
+            print(f"Error fetching from subreddit {subreddit_name}: {e}")
+            return None
+    
+    def get_multiple_rants(self, count: int = 5, concurrent: bool = True,
+                           deadline: float = 8.0) -> List[Dict[str, str]]:
+        """
+        Get multiple rants for variety.
+        concurrent: fan out across rant_subreddits on the worker pool
+        deadline: seconds to wait before returning whatever has been collected
+        """
+        max_attempts = count * 3  # Try up to 3 times per requested rant
+        
+        if not concurrent:
+            rants = []
+            attempts = 0
+            while len(rants) < count and attempts < max_attempts:
+                rant = self.get_random_rant()
+                if rant:
+                    rants.append(rant)
+                attempts += 1
+            return rants
+        
+        # Spread the requested rants round-robin over a shuffled subreddit order
+        subreddits = random.sample(self.rant_subreddits, len(self.rant_subreddits))
+        end_time = time.time() + deadline
         rants = []
         attempts = 0
-        max_attempts = count * 3  # Try up to 3 times per requested rant
+        pending = set()
         
-        while len(rants) < count and attempts < max_attempts:
-            rant = self.get_random_rant()
-            if rant:
-                rants.append(rant)
+        def submit_next():
+            nonlocal attempts
+            subreddit_name = subreddits[attempts % len(subreddits)]
             attempts += 1
+            pending.add(self._executor.submit(self._get_rant_from, subreddit_name))
         
-        return rants
+        for _ in range(min(count, max_attempts)):
+            submit_next()
+        
+        while pending and len(rants) < count:
+            remaining = end_time - time.time()
+            if remaining <= 0:
+                break
+            
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                rant = future.result()
+                if rant:
+                    rants.append(rant)
+                elif attempts < max_attempts:
+                    # Retry a failed slot on the next subreddit
+                    submit_next()
+        
+        # Late results still land in the listing cache for the next caller
+        for future in pending:
+            future.cancel()
+        
+        return rants[:count]
 
 # Fallback scraper without API (for testing or if API fails)
 class FallbackRantScraper:
-    def __init__(self):
-        """Initialize fallback scraper with some sample rants."""
+    using_live_data = False
+    
+    def __init__(self, corpus_path: str = None, weighted: bool = None):
+        """
+        Initialize fallback scraper with some sample rants.
+        corpus_path: optional JSONL rant corpus (defaults to FALLBACK_CORPUS_PATH);
+        it is memory-mapped, so arbitrarily large files are fine
+        weighted: sample corpus rants in proportion to their Reddit score
+        (defaults to FALLBACK_CORPUS_WEIGHTED)
+        """
+        corpus_path = corpus_path or os.getenv('FALLBACK_CORPUS_PATH')
+        self.corpus = None
+        if corpus_path and os.path.exists(corpus_path):
+            self.corpus = JsonlRantCorpus(corpus_path)
+            if not len(self.corpus):
+                self.corpus = None
+        if weighted is None:
+            weighted = os.getenv('FALLBACK_CORPUS_WEIGHTED', 'false').lower() in ('1', 'true', 'yes')
+        self.weighted = weighted
+        
         self.sample_rants = [
             {
                 'title': "People who don't use turn signals",
@@ -156,12 +517,181 @@ class FallbackRantScraper:
     
     def get_random_rant(self) -> Dict[str, str]:
         """Return a random sample rant."""
+        if self.corpus:
+            return self.corpus.weighted_rant() if self.weighted else self.corpus.random_rant()
         return random.choice(self.sample_rants)
     
     def get_multiple_rants(self, count: int = 5) -> List[Dict[str, str]]:
         """Return multiple sample rants."""
+        if self.corpus:
+            return self.corpus.random_rants(count)
         return [self.get_random_rant() for _ in range(min(count, len(self.sample_rants)))]
 
+class RantIngester:
+    """
+    Background ingester that fills a RantStore from Reddit
+    Reuses RedditRantScraper's filtering and clean_text so stored rants
+    look exactly like live ones
+    In incremental mode it follows each subreddit's 'new' listing from a
+    stored cursor, so only posts we have not seen are downloaded
+    """
+    
+    def __init__(self, store: RantStore, scraper: RedditRantScraper, interval: int = 600,
+                 limit: int = 100, incremental: bool = False, cursor_max_age: int = 86400):
+        """
+        incremental: follow 'new' listings with persisted cursors instead of re-reading hot()
+        cursor_max_age: seconds after which a cursor that yields nothing is reset
+        (Reddit returns an empty listing if the cursor post was deleted)
+        """
+        self.store = store
+        self.scraper = scraper
+        self.interval = interval
+        self.limit = limit
+        self.incremental = incremental
+        self.cursor_max_age = cursor_max_age
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {'cycles': 0, 'fetched': 0, 'kept': 0, 'added': 0, 'errors': 0,
+                      'last_cycle': None, 'last_report': {}}
+    
+    def _ingest_subreddit(self, subreddit_name: str) -> Dict[str, int]:
+        """Fetch, filter and store one subreddit listing."""
+        before = None
+        cursor = self.store.get_cursor(subreddit_name) if self.incremental else None
+        if cursor:
+            before = cursor['before']
+        
+        listing = 'new' if self.incremental else 'hot'
+        posts = self.scraper.fetch_posts(subreddit_name, self.limit, listing=listing, before=before)
+        candidates, _ = self.scraper.filter_posts(posts, subreddit_name)
+        added = self.store.add_rants(candidates)
+        
+        if self.incremental:
+            if posts:
+                # Listings are newest-first, so the first post is the new cursor
+                self.store.set_cursor(subreddit_name, posts[0].fullname)
+            elif cursor and time.time() - (cursor['updated_at'] or 0) > self.cursor_max_age:
+                self.store.set_cursor(subreddit_name, None)
+        
+        return {'fetched': len(posts), 'kept': len(candidates), 'added': added}
+    
+    def ingest_once(self) -> Dict[str, Dict[str, int]]:
+        """
+        Run one pass over every rant subreddit.
+        Returns a per-subreddit report of posts fetched, kept and newly stored.
+        """
+        report = {}
+        for subreddit_name in self.scraper.rant_subreddits:
+            if self._stop.is_set():
+                break
+            try:
+                report[subreddit_name] = self._ingest_subreddit(subreddit_name)
+            except Exception as e:
+                self.stats['errors'] += 1
+                print(f"Error ingesting from subreddit {subreddit_name}: {e}")
+        
+        for key in ('fetched', 'kept', 'added'):
+            self.stats[key] += sum(r[key] for r in report.values())
+        self.stats['cycles'] += 1
+        self.stats['last_cycle'] = time.time()
+        self.stats['last_report'] = report
+        
+        fetched = sum(r['fetched'] for r in report.values())
+        kept = sum(r['kept'] for r in report.values())
+        print(f"Ingest cycle {self.stats['cycles']}: fetched {fetched} posts, kept {kept} rants")
+        return report
+    
+    def _run(self):
+        while not self._stop.is_set():
+            self.ingest_once()
+            self._stop.wait(self.interval)
+    
+    def start(self):
+        """Start ingesting in a daemon thread."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        """Stop the ingest thread."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+# Corpus-backed scraper: samples rants from the local store at disk speed
+class LocalRantScraper:
+    def __init__(self, store: RantStore = None, live_scraper: RedditRantScraper = None,
+                 ingest: bool = True, ingest_interval: int = 600, incremental: bool = True):
+        """
+        Initialize the local scraper over a RantStore.
+        live_scraper: optional scraper used to serve requests while the corpus is
+        still empty and, if ingest is set and it serves live Reddit data, to fill
+        it in the background (a FallbackRantScraper only acts as the backstop)
+        incremental: ingest only unseen posts from 'new' listings
+        """
+        self.store = store or RantStore()
+        self.live_scraper = live_scraper
+        self.using_live_data = bool(live_scraper is not None and live_scraper.using_live_data)
+        self.ingester = None
+        if self.using_live_data and ingest:
+            self.ingester = RantIngester(self.store, live_scraper, interval=ingest_interval,
+                                         incremental=incremental)
+            self.ingester.start()
+    
+    def get_random_rant(self) -> Dict[str, str]:
+        """Sample a random rant from the local corpus."""
+        rant = self.store.random_rant()
+        if rant is None and self.live_scraper is not None:
+            return self.live_scraper.get_random_rant()
+        return rant
+    
+    def get_multiple_rants(self, count: int = 5) -> List[Dict[str, str]]:
+        """Sample multiple distinct rants from the local corpus."""
+        rants = self.store.random_rants(count)
+        if not rants and self.live_scraper is not None:
+            return self.live_scraper.get_multiple_rants(count)
+        return rants
+
+# Global scraper instance shared by the API handlers and the cache
+_scraper_instance = None
+_scraper_lock = threading.Lock()
+
+def _create_scraper():
+    """Pick the best available scraper for this process."""
+    try:
+        if os.getenv('REDDIT_CLIENT_ID') and os.getenv('REDDIT_CLIENT_SECRET'):
+            scraper = RedditRantScraper()
+            print("Using Reddit API scraper")
+        else:
+            scraper = FallbackRantScraper()
+            print("Using fallback scraper (no Reddit API credentials)")
+    except Exception as e:
+        print(f"Error initializing main scraper: {e}")
+        scraper = FallbackRantScraper()
+        print("Using fallback scraper")
+    
+    # Serve rants from the local corpus when configured, ingesting from Reddit if live;
+    # without Reddit the fallback scraper stays as a read-only backstop for an empty corpus
+    if os.getenv('RANT_CORPUS_DB'):
+        scraper = LocalRantScraper(live_scraper=scraper, ingest=scraper.using_live_data)
+        print(f"Using local rant corpus ({scraper.store.count()} rants)")
+    
+    return scraper
+
+def get_scraper():
+    """
+    Get the process-wide scraper instance.
+    Every consumer shares one PRAW client, one HTTP connection pool and one
+    rate-limit budget instead of building its own.
+    """
+    global _scraper_instance
+    with _scraper_lock:
+        if _scraper_instance is None:
+            _scraper_instance = _create_scraper()
+        return _scraper_instance
+
 if __name__ == "__main__":
     # Test the scraper
     print("Testing Reddit Rant Scraper...")
@@ -0,0 +1,105 @@
+"""
+Weighted Sampling for Reddit Rant Roulette
+Walker/Vose alias tables for O(1) weighted draws
+"""
+import random
+from array import array
+from typing import Any, Callable, List, Optional, Sequence
+
+
+class AliasTable:
+    """
+    Alias table over a sequence of non-negative weights
+    Built in O(n); each draw is O(1): one uniform index plus one coin flip.
+    Probabilities and aliases live in compact arrays so tables over
+    millions of items stay small.
+    """
+
+    def __init__(self, weights: Sequence[float]):
+        n = len(weights)
+        self.size = n
+        self._prob = array('d', [1.0]) * n
+        self._alias = array('L', range(n))
+        if n == 0:
+            return
+
+        total = float(sum(weights))
+        if total <= 0:
+            # All-zero weights degrade to a uniform table
+            return
+
+        # Vose's method: scale to mean 1, then pair each small slot with a large one
+        scaled = array('d', (w * n / total for w in weights))
+        small = [i for i in range(n) if scaled[i] < 1.0]
+        large = [i for i in range(n) if scaled[i] >= 1.0]
+        while small and large:
+            lo = small.pop()
+            hi = large.pop()
+            self._prob[lo] = scaled[lo]
+            self._alias[lo] = hi
+            scaled[hi] = scaled[hi] + scaled[lo] - 1.0
+            (small if scaled[hi] < 1.0 else large).append(hi)
+
+        # Leftovers are exactly 1 up to rounding error
+        for i in large + small:
+            self._prob[i] = 1.0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def sample(self, rng: random.Random = random) -> int:
+        """Draw one index in proportion to its weight."""
+        if not self.size:
+            raise IndexError("sample from an empty AliasTable")
+        i = min(int(rng.random() * self.size), self.size - 1)
+        return i if rng.random() < self._prob[i] else self._alias[i]
+
+
+class WeightedCandidatePool:
+    """
+    Weighted draws without replacement over a candidate list
+    Drawn items are tombstoned and redrawn around; once half of the total
+    weight has been drawn the alias table is rebuilt over what remains, so
+    each draw stays O(1) amortized regardless of pool size.
+    """
+
+    def __init__(self, items: Sequence, weight_fn: Callable[[Any], float], rebuild_ratio: float = 0.5):
+        self.weight_fn = weight_fn
+        self.rebuild_ratio = rebuild_ratio
+        self.rebuilds = 0
+        # A tiny floor keeps zero-weight candidates drawable once heavier ones run out
+        self._build(list(items), [max(float(weight_fn(item)), 1e-9) for item in items])
+
+    def _build(self, items: List, weights: List[float]):
+        self._items = items
+        self._weights = weights
+        self._taken = bytearray(len(items))
+        self._remaining = len(items)
+        self._total_weight = sum(weights)
+        self._taken_weight = 0.0
+        self._table = AliasTable(weights)
+
+    def _rebuild(self):
+        """Rebuild the alias table over the candidates not yet drawn."""
+        keep = [i for i in range(len(self._items)) if not self._taken[i]]
+        self._build([self._items[i] for i in keep], [self._weights[i] for i in keep])
+        self.rebuilds += 1
+
+    def __len__(self) -> int:
+        return self._remaining
+
+    def draw(self, rng: random.Random = random) -> Optional[Any]:
+        """Draw one candidate in proportion to its weight and remove it from the pool."""
+        if not self._remaining:
+            return None
+        if self._taken_weight >= self._total_weight * self.rebuild_ratio:
+            self._rebuild()
+
+        while True:
+            i = self._table.sample(rng)
+            if not self._taken[i]:
+                break
+        self._taken[i] = 1
+        self._remaining -= 1
+        self._taken_weight += self._weights[i]
+        return self._items[i]
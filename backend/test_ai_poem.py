@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Tests for poem generation helpers
+Runs offline against StubPoemProvider: hedged requests, batch response
+parsing and incremental poem cleaning
+"""
+import time
+
+import pytest
+
+from aiPoem import (HedgedPoemProvider, IncrementalPoemCleaner, StubPoemProvider,
+                    _parse_batch_poems, clean_poem_text)
+
+PROMPT = "RANT:\nMy neighbour mows the lawn at six every Sunday morning"
+
+
+def _poem(tag, lines=4):
+    return '\n'.join(f"{tag} line {n}" for n in range(1, lines + 1))
+
+
+def test_hedge_sent_after_delay():
+    """A primary slower than the hedge delay loses to the secondary"""
+    hedged = HedgedPoemProvider(StubPoemProvider(delay=1.0), StubPoemProvider(), initial_delay=0.1)
+
+    started = time.monotonic()
+    text = hedged.generate_text(PROMPT)
+    elapsed = time.monotonic() - started
+
+    assert text == StubPoemProvider().generate_text(PROMPT)
+    assert 0.1 <= elapsed < 0.8
+    stats = hedged.get_stats()
+    assert stats['hedges_sent'] == 1
+    assert stats['hedge_wins'] == 1
+
+
+def test_fast_primary_not_hedged():
+    """A primary answering within the hedge delay is never hedged"""
+    secondary = StubPoemProvider()
+    hedged = HedgedPoemProvider(StubPoemProvider(), secondary, initial_delay=1.0)
+
+    hedged.generate_text(PROMPT)
+    assert hedged.get_stats()['hedges_sent'] == 0
+    assert secondary.stats['calls'] == 0
+
+
+def test_hedge_budget_denied():
+    """With no budget, the starting credit allows one hedge and later ones are denied"""
+    secondary = StubPoemProvider()
+    hedged = HedgedPoemProvider(StubPoemProvider(delay=0.3), secondary, budget=0, initial_delay=0.05)
+
+    for _ in range(3):
+        hedged.generate_text(PROMPT)
+
+    stats = hedged.get_stats()
+    assert stats['hedges_sent'] == 1
+    assert stats['budget_denied'] == 2
+    assert secondary.stats['calls'] == 1
+
+
+def test_parse_batch_skips_missing_and_short_poems():
+    """Missing and too-short poems parse as empty; the preamble is ignored"""
+    text = (f"Here are your poems:\n=== POEM 1 ===\n{_poem('first')}\n\n"
+            f"=== POEM 2 ===\n{_poem('short', lines=2)}\n")
+
+    assert _parse_batch_poems(text, 3) == [[_poem('first')], [], []]
+
+
+def test_parse_batch_variants():
+    """Variants land under their rant; out-of-range and repeated markers are dropped"""
+    text = '\n'.join([
+        "=== POEM 1 VARIANT 2 ===", _poem('one-b'),
+        "=== POEM 1 VARIANT 1 ===", _poem('one-a'),
+        "=== POEM 1 VARIANT 3 ===", _poem('one-c'),
+        "=== POEM 2 VARIANT 1 ===", _poem('two-a'),
+        "=== POEM 2 VARIANT 1 ===", _poem('two-again'),
+        "=== POEM 3 VARIANT 1 ===", _poem('three-a'),
+    ])
+
+    assert _parse_batch_poems(text, 2, variants=2) == [
+        [_poem('one-a'), _poem('one-b')],
+        [_poem('two-a')],
+    ]
+
+
+@pytest.mark.parametrize('raw', [
+    f"Here's the poem: {_poem('inline')}",
+    f"Poem:\n\n{_poem('own-line')}",
+    f"\n\n{_poem('stanza')}\n\n{_poem('second')}\n",
+    f"{_poem('trailer')}\n\nThis poem captures the frustration.\nMore notes",
+    f"  Here is your poem:\n  indented first\n    indented second\n{_poem('rest')}",
+])
+@pytest.mark.parametrize('chunk_size', [1, 7, 1000])
+def test_incremental_cleaner_matches_clean_poem_text(raw, chunk_size):
+    """Feeding a response in chunks yields the same poem as cleaning it whole"""
+    cleaner = IncrementalPoemCleaner()
+    lines = []
+    for start in range(0, len(raw), chunk_size):
+        lines += cleaner.feed(raw[start:start + chunk_size])
+    lines += cleaner.finish()
+
+    assert '\n'.join(lines) == clean_poem_text(raw)
+    assert cleaner.poem == clean_poem_text(raw)
+
+
+if __name__ == "__main__":
+    test_hedge_sent_after_delay()
+    test_fast_primary_not_hedged()
+    test_hedge_budget_denied()
+    test_parse_batch_skips_missing_and_short_poems()
+    test_parse_batch_variants()
+    print("✅ Poem generation tests passed")
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Tests for near-duplicate detection
+Checks that the SimHash band buckets find every fingerprint within the threshold
+"""
+import random
+
+import pytest
+
+from dedup import NearDuplicateIndex
+
+
+def _flip_bits(fingerprint, count, rng):
+    """Flip `count` distinct random bits of a 64-bit fingerprint"""
+    for bit in rng.sample(range(NearDuplicateIndex.BITS), count):
+        fingerprint ^= 1 << bit
+    return fingerprint
+
+
+@pytest.mark.parametrize('threshold', [0.75, 0.85, 0.9])
+def test_band_recall_within_threshold(threshold):
+    """Every fingerprint within max_distance bits shares a band bucket and is found"""
+    index = NearDuplicateIndex(threshold=threshold)
+    index.fingerprint = lambda text: int(text)
+    rng = random.Random(7)
+
+    for trial in range(200):
+        original = rng.getrandbits(NearDuplicateIndex.BITS)
+        index.add(str(original), trial)
+        distance = rng.randint(0, index.max_distance)
+        assert index.find(str(_flip_bits(original, distance, rng))) == trial
+
+
+def test_beyond_threshold_not_matched():
+    """Fingerprints further apart than max_distance never match, even in a shared bucket"""
+    rng = random.Random(11)
+
+    for _ in range(200):
+        index = NearDuplicateIndex(threshold=0.85)
+        index.fingerprint = lambda text: int(text)
+        original = rng.getrandbits(NearDuplicateIndex.BITS)
+        index.add(str(original))
+        assert index.find(str(_flip_bits(original, index.max_distance + 1, rng))) is None
+
+
+def test_reworded_repost_found():
+    """A lightly reworded rant maps to the poem of the original"""
+    index = NearDuplicateIndex(threshold=0.85)
+    original = ("I am so tired of people who never use their turn signals on the highway. "
+                "It is the law, it takes two inches of finger movement, and yet every single "
+                "day someone cuts across three lanes without a blink.")
+    index.add(original, {'poem': 'signal poem'})
+
+    reworded = original.replace("every single day", "every day")
+    assert index.find(reworded) == {'poem': 'signal poem'}
+    assert index.find("My landlord raised the rent again and the heating is still broken.") is None
+
+
+if __name__ == "__main__":
+    for threshold in (0.75, 0.85, 0.9):
+        test_band_recall_within_threshold(threshold)
+    test_beyond_threshold_not_matched()
+    test_reworded_repost_found()
+    print("✅ Near-duplicate tests passed")
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Tests for the Reddit rate scheduler
+Checks that an exhausted quota recovers once the reset window passes
+"""
+import time
+
+import pytest
+
+from rate_limiter import RateLimitExceeded, RedditRateScheduler
+
+
+def test_recovers_after_exhaustion():
+    """A quota at or below the reserve blocks calls only until the reset"""
+    scheduler = RedditRateScheduler(requests_per_minute=600, reserve=5)
+    scheduler.update_from_limits({'remaining': 3, 'reset_timestamp': time.time() + 1.2, 'used': 597})
+
+    with pytest.raises(RateLimitExceeded):
+        scheduler.acquire(max_wait=0)
+
+    waited = scheduler.acquire(max_wait=3)
+    assert 0 < waited <= 3
+    assert scheduler.get_stats()['rate_per_second'] == pytest.approx(10)
+    assert scheduler.acquire(max_wait=0) == 0
+
+
+def test_spreads_remaining_quota():
+    """Headers with quota left resize the bucket without blocking"""
+    scheduler = RedditRateScheduler(requests_per_minute=600, reserve=5)
+    scheduler.update_from_limits({'remaining': 65, 'reset_timestamp': time.time() + 60, 'used': 535})
+
+    assert scheduler.acquire(max_wait=0) == 0
+    assert scheduler.get_stats()['rate_per_second'] == pytest.approx(1, rel=0.05)
+
+
+if __name__ == "__main__":
+    test_recovers_after_exhaustion()
+    test_spreads_remaining_quota()
+    print("✅ Rate limiter tests passed")
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Tests for weighted sampling
+Checks alias-table draw frequencies and draws without replacement from the candidate pool
+"""
+import random
+from collections import Counter
+
+import pytest
+
+from sampling import AliasTable, WeightedCandidatePool
+
+
+def test_alias_table_matches_weights():
+    """Draw frequencies follow the weights"""
+    weights = [1, 2, 3, 4, 0]
+    table = AliasTable(weights)
+    rng = random.Random(3)
+    draws = Counter(table.sample(rng) for _ in range(100000))
+
+    assert draws[4] == 0
+    for index, weight in enumerate(weights[:4]):
+        assert draws[index] / 100000 == pytest.approx(weight / sum(weights), abs=0.01)
+
+
+def test_alias_table_degenerate_weights():
+    """All-zero weights sample uniformly; an empty table cannot be sampled"""
+    table = AliasTable([0, 0, 0])
+    rng = random.Random(5)
+    draws = Counter(table.sample(rng) for _ in range(30000))
+    assert set(draws) == {0, 1, 2}
+    assert min(draws.values()) / 30000 == pytest.approx(1 / 3, abs=0.02)
+
+    with pytest.raises(IndexError):
+        AliasTable([]).sample()
+
+
+def test_pool_draws_each_candidate_once():
+    """Every candidate comes out exactly once, including zero-weight ones, then None"""
+    items = list(range(50))
+    pool = WeightedCandidatePool(items, lambda item: item % 5)
+    rng = random.Random(9)
+
+    drawn = [pool.draw(rng) for _ in range(50)]
+    assert sorted(drawn) == items
+    assert len(pool) == 0
+    assert pool.draw(rng) is None
+    assert pool.rebuilds > 0
+
+
+def test_pool_favors_heavy_candidates():
+    """The heaviest candidate is usually drawn first"""
+    rng = random.Random(13)
+    firsts = Counter(
+        WeightedCandidatePool(['light', 'medium', 'heavy'], {'light': 1, 'medium': 2, 'heavy': 7}.get).draw(rng)
+        for _ in range(5000)
+    )
+    assert firsts['heavy'] / 5000 == pytest.approx(0.7, abs=0.03)
+    assert firsts['light'] < firsts['medium'] < firsts['heavy']
+
+
+if __name__ == "__main__":
+    test_alias_table_matches_weights()
+    test_alias_table_degenerate_weights()
+    test_pool_draws_each_candidate_once()
+    test_pool_favors_heavy_candidates()
+    print("✅ Sampling tests passed")